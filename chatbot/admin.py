@@ -6,7 +6,102 @@ so they can be managed through the web-based admin panel.
 """
 
 from django.contrib import admin
-from .models import ChatSession, ChatMessage
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.functions import Substr
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.functional import cached_property
+from .analytics import get_recent_stats
+from .models import ChatSession, ChatMessage, DailyChatStats
+
+# Number of characters shown in message previews
+PREVIEW_LENGTH = 50
+
+
+def estimate_row_count(model):
+    """
+    Return a cheap estimate of the number of rows in a model's table.
+
+    Uses the planner statistics on PostgreSQL and MySQL and the span of
+    rowids on SQLite, none of which need a full table scan. The SQLite
+    estimate is high when rows in the middle of the table were deleted,
+    but old rows removed by compact_history do not inflate it.
+
+    Args:
+        model (Model): The model class to estimate
+
+    Returns:
+        int: Estimated row count, or None if no estimate is available
+    """
+    connection = connections[model.objects.db]
+    table = model._meta.db_table
+
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    elif connection.vendor == 'mysql':
+        sql = ('SELECT table_rows FROM information_schema.tables '
+               'WHERE table_schema = DATABASE() AND table_name = %s')
+    elif connection.vendor == 'sqlite':
+        sql = 'SELECT MAX(rowid) - MIN(rowid) + 1 FROM %s' % connection.ops.quote_name(table)
+        table = None
+    else:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table] if table else [])
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids COUNT(*) on large unfiltered tables.
+
+    When the changelist is not filtered and the table is estimated to
+    hold more than ESTIMATE_THRESHOLD rows, the estimate is used as the
+    count. Smaller or filtered result sets are counted exactly.
+    """
+    ESTIMATE_THRESHOLD = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where:
+            estimate = estimate_row_count(queryset.model)
+            if estimate is not None and estimate > self.ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class SessionAutocompleteFilter(admin.SimpleListFilter):
+    """
+    Filter messages by session using the admin autocomplete endpoint.
+
+    Unlike a plain list_filter on the foreign key, this never loads
+    every session to build the list of choices.
+    """
+    title = 'session'
+    parameter_name = 'session'
+    template = 'admin/chatbot/session_autocomplete_filter.html'
+
+    def lookups(self, request, model_admin):
+        """Only the selected session is listed, the rest come from autocomplete."""
+        value = self.value()
+        if value and value.isdigit():
+            session = ChatSession.objects.filter(pk=value).only('session_id').first()
+            if session:
+                return [(value, session.session_id)]
+        return []
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(session_id=value)
+        return queryset
 
 
 @admin.register(ChatSession)
@@ -19,6 +114,8 @@ class ChatSessionAdmin(admin.ModelAdmin):
     search_fields = ('session_id',)
     readonly_fields = ('created_at', 'updated_at')
     ordering = ('-created_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(ChatMessage)
@@ -27,22 +124,84 @@ class ChatMessageAdmin(admin.ModelAdmin):
     Admin configuration for ChatMessage model.
     """
     list_display = ('get_session_id', 'user_message_preview', 'bot_response_preview', 'timestamp')
-    list_filter = ('timestamp', 'session')
+    list_filter = ('timestamp', SessionAutocompleteFilter)
+    list_select_related = ('session',)
+    autocomplete_fields = ('session',)
     search_fields = ('user_message', 'bot_response')
     readonly_fields = ('timestamp',)
     ordering = ('-timestamp',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        """
+        Truncate message bodies in the database for the changelist.
+
+        The full text fields are deferred and only the first
+        PREVIEW_LENGTH + 1 characters are fetched, which is enough
+        to know whether the preview needs an ellipsis.
+        """
+        queryset = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith('_changelist'):
+            queryset = queryset.defer('user_message', 'bot_response').annotate(
+                user_message_short=Substr('user_message', 1, PREVIEW_LENGTH + 1),
+                bot_response_short=Substr('bot_response', 1, PREVIEW_LENGTH + 1)
+            )
+        return queryset
+
+    def get_urls(self):
+        """Add the analytics page to this model's admin URLs."""
+        urls = [
+            path(
+                'analytics/',
+                self.admin_site.admin_view(self.analytics_view),
+                name='chatbot_chatmessage_analytics'
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def analytics_view(self, request):
+        """Show message and session counts from the precomputed daily stats."""
+        stats = get_recent_stats(days=30)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Chat analytics (last 30 days)',
+            'stats': stats,
+            'total_messages': sum(day.message_count for day in stats),
+            'max_messages': max((day.message_count for day in stats), default=0),
+        }
+        return TemplateResponse(request, 'admin/chatbot/analytics.html', context)
 
     def get_session_id(self, obj):
         """Get session ID for display in admin list."""
         return obj.session.session_id if obj.session else 'No Session'
     get_session_id.short_description = 'Session ID'
 
+    def _preview(self, obj, field):
+        """Return a shortened message, using the truncated value when available."""
+        text = getattr(obj, field + '_short', None)
+        if text is None:
+            text = getattr(obj, field)
+        return text[:PREVIEW_LENGTH] + '...' if len(text) > PREVIEW_LENGTH else text
+
     def user_message_preview(self, obj):
         """Show preview of user message in admin list."""
-        return obj.user_message[:50] + '...' if len(obj.user_message) > 50 else obj.user_message
+        return self._preview(obj, 'user_message')
     user_message_preview.short_description = 'User Message'
 
     def bot_response_preview(self, obj):
         """Show preview of bot response in admin list."""
-        return obj.bot_response[:50] + '...' if len(obj.bot_response) > 50 else obj.bot_response
-    bot_response_preview.short_description = 'Bot Response'
\ No newline at end of file
+        return self._preview(obj, 'bot_response')
+    bot_response_preview.short_description = 'Bot Response'
+
+
+@admin.register(DailyChatStats)
+class DailyChatStatsAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for DailyChatStats model.
+    """
+    list_display = ('date', 'message_count', 'session_count', 'is_final', 'updated_at')
+    date_hierarchy = 'date'
+    readonly_fields = ('date', 'message_count', 'session_count', 'is_final', 'updated_at')
+    ordering = ('-date',)
@@ -0,0 +1,83 @@
+"""
+Chat analytics helpers.
+
+This module rolls ChatMessage rows up into DailyChatStats so that
+reports can read one small row per day instead of counting messages.
+"""
+
+import datetime
+
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ChatMessage, DailyChatStats
+
+
+def rollup_daily_stats(start_date, end_date, finalize=False):
+    """
+    Recompute DailyChatStats for every day in [start_date, end_date).
+
+    Days that no longer have any messages are left untouched, so stats
+    survive after old messages have been archived and deleted. Final
+    days are never recomputed, because some of their messages may be
+    gone already, e.g. after an interrupted compact_history run.
+
+    Args:
+        start_date (date): First day to include
+        end_date (date): Day after the last day to include
+        finalize (bool): Mark the days written as final
+
+    Returns:
+        int: Number of days written
+    """
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.datetime.combine(start_date, datetime.time.min), tz)
+    end = timezone.make_aware(datetime.datetime.combine(end_date, datetime.time.min), tz)
+
+    rows = (
+        ChatMessage.objects
+        .filter(timestamp__gte=start, timestamp__lt=end)
+        .annotate(day=TruncDate('timestamp', tzinfo=tz))
+        .order_by()
+        .values('day')
+        .annotate(
+            message_count=Count('id'),
+            session_count=Count('session', distinct=True)
+        )
+    )
+
+    final_days = set(
+        DailyChatStats.objects
+        .filter(date__gte=start_date, date__lt=end_date, is_final=True)
+        .values_list('date', flat=True)
+    )
+
+    days = 0
+    for row in rows:
+        if row['day'] in final_days:
+            continue
+        DailyChatStats.objects.update_or_create(
+            date=row['day'],
+            defaults={
+                'message_count': row['message_count'],
+                'session_count': row['session_count'],
+                'is_final': finalize,
+            }
+        )
+        days += 1
+    return days
+
+
+def get_recent_stats(days=30):
+    """
+    Return the precomputed stats for the most recent days.
+
+    Args:
+        days (int): Number of days to include
+
+    Returns:
+        list: DailyChatStats rows, newest first
+    """
+    since = timezone.localdate() - datetime.timedelta(days=days - 1)
+    return list(DailyChatStats.objects.filter(date__gte=since))
@@ -16,4 +16,16 @@ class ChatbotConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chatbot'
-    verbose_name = 'Chatbot Application'
\ No newline at end of file
+    verbose_name = 'Chatbot Application'
+
+    def ready(self):
+        """
+        Start tracing memory allocations if profiling is enabled.
+
+        This happens before the chatbot is created and trained, so the
+        profiler can attribute that memory to its components.
+        """
+        from .profiling import is_profiling_enabled, profiler
+
+        if is_profiling_enabled():
+            profiler.start()
\ No newline at end of file
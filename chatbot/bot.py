@@ -11,10 +11,16 @@ import os
 from chatterbot import ChatBot
 from chatterbot.trainers import ChatterBotCorpusTrainer, ListTrainer
 from django.conf import settings
+from .context import conversation_cache
+from .profiling import record_stage
+from .snapshot import build_snapshot, iter_prompt_responses, load_snapshot
 
 # Get the base directory of the Django project
 BASE_DIR = getattr(settings, 'BASE_DIR', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Persisted BK-tree used by the typo-tolerant logic adapter
+TYPO_INDEX_PATH = os.path.join(BASE_DIR, 'chatbot_typo_index.pickle')
+
 def create_chatbot():
     """
     Create and configure the chatbot instance.
@@ -28,9 +34,13 @@ def create_chatbot():
         database_uri='sqlite:///chatbot_database.sqlite3',
         logic_adapters=[
             {
-                'import_path': 'chatterbot.logic.BestMatch',
+                # BestMatch that answers known prompts and small typos from
+                # a persisted BK-tree, and only scans candidates otherwise
+                'import_path': 'chatbot.logic.TypoTolerantMatch',
                 'default_response': 'I am sorry, but I do not understand. I am still learning.',
-                'maximum_similarity_threshold': 0.90
+                'maximum_similarity_threshold': 0.90,
+                'maximum_edit_distance': 3,
+                'index_path': TYPO_INDEX_PATH
             }
         ]
     )
@@ -80,21 +90,78 @@ chatbot = create_chatbot()
 # Train the chatbot when the module is imported
 train_chatbot(chatbot)
 
-def get_bot_response(user_input):
+# Shown at /debug/memory/ when memory profiling is enabled
+record_stage('after training')
+
+# Memory-mapped responses for known prompts, built with `manage.py build_response_snapshot`
+SNAPSHOT_PATH = getattr(settings, 'CHATBOT_RESPONSE_SNAPSHOT', None)
+response_snapshot = load_snapshot(SNAPSHOT_PATH)
+
+def rebuild_snapshot(path=None):
+    """
+    Export the chatbot's prompts and responses to a snapshot file.
+
+    Args:
+        path (str): Where to write the snapshot, defaults to the setting
+
+    Returns:
+        int: Number of prompts in the snapshot
+    """
+    path = path or SNAPSHOT_PATH
+    if not path:
+        raise ValueError('CHATBOT_RESPONSE_SNAPSHOT is not set')
+    return build_snapshot(iter_prompt_responses(chatbot.storage), path)
+
+def reload_snapshot():
+    """
+    Map the latest snapshot file in place of the one in use.
+    """
+    global response_snapshot
+    response_snapshot = load_snapshot(SNAPSHOT_PATH)
+    return response_snapshot is not None
+
+def get_bot_response(user_input, session_id=None, raise_errors=False):
     """
     Get a response from the chatbot for the given user input.
 
+    Messages that exactly match a known prompt are answered from the
+    response snapshot without touching the database. Anything else goes
+    through ChatterBot, which also learns from it.
+
+    When a session ID is given, it is passed to ChatterBot as the
+    conversation. The previous bot response is taken from the in-memory
+    conversation cache instead of the database, the logic adapters can
+    read the session's recent turns from the same cache, and the new
+    turn is added to it.
+
     Args:
         user_input (str): The user's message
+        session_id (str): Optional chat session identifier
+        raise_errors (bool): Raise errors instead of returning an apology,
+            so callers can tell a failure from a real answer
 
     Returns:
         str: The chatbot's response
     """
     try:
-        # Get response from the chatbot
-        response = chatbot.get_response(user_input)
-        return str(response)
+        response = response_snapshot.lookup(user_input) if response_snapshot else None
+
+        if response is None and session_id is None:
+            # Get response from the chatbot
+            response = str(chatbot.get_response(user_input))
+        elif response is None:
+            response = str(chatbot.get_response(
+                user_input,
+                conversation=session_id,
+                in_response_to=conversation_cache.get_last_response(session_id)
+            ))
+
+        if session_id is not None:
+            conversation_cache.record(session_id, user_input, response)
+        return response
     except Exception as e:
+        if raise_errors:
+            raise
         # Return a default response if there's an error
         return f"Sorry, I had trouble understanding that. Please try again."
 
@@ -107,6 +174,9 @@ def reset_chatbot():
     try:
         # Clear the chatbot's storage
         chatbot.storage.drop()
+        # The typo index covers the old statements, so build it again
+        if os.path.exists(TYPO_INDEX_PATH):
+            os.remove(TYPO_INDEX_PATH)
         # Recreate and retrain the chatbot
         chatbot = create_chatbot()
         train_chatbot(chatbot)
@@ -0,0 +1,223 @@
+"""
+Per-session conversation context for the chatbot.
+
+This module keeps the most recent turns of every chat session in
+process memory, so the bot can use conversation history without
+querying ChatMessage on each request. New turns are written to the
+database in batches by a background thread.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Default limits, override with the CHATBOT_CONTEXT_CACHE setting
+DEFAULT_OPTIONS = {
+    'MAX_TURNS_PER_SESSION': 10,
+    'MAX_SESSIONS': 10000,
+    'MAX_PENDING': 5000,
+    'FLUSH_INTERVAL': 2.0,
+    'ASYNC_FLUSH': True,
+}
+
+
+class ConversationContextCache:
+    """
+    A bounded cache of recent turns for each chat session.
+
+    Every session gets a ring buffer of at most max_turns turns.
+    When more than max_sessions sessions are cached, the least
+    recently used session is dropped. Turns waiting to be saved are
+    kept in a separate bounded queue that is flushed to ChatMessage.
+    """
+
+    def __init__(self, max_turns=10, max_sessions=10000, max_pending=5000,
+                 flush_interval=2.0, async_flush=True):
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.flush_interval = flush_interval
+        self.async_flush = async_flush
+
+        self._sessions = OrderedDict()
+        self._pending = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self._writer = None
+
+    def get_context(self, session_id):
+        """
+        Return the recent turns for a session, oldest first.
+
+        Args:
+            session_id (str): The chat session identifier
+
+        Returns:
+            list: (user_message, bot_response) tuples
+        """
+        with self._lock:
+            turns = self._sessions.get(session_id)
+            if turns is None:
+                return []
+            self._sessions.move_to_end(session_id)
+            return list(turns)
+
+    def get_last_response(self, session_id):
+        """
+        Return the bot's last response in a session, or None.
+        """
+        with self._lock:
+            turns = self._sessions.get(session_id)
+            return turns[-1][1] if turns else None
+
+    def record(self, session_id, user_message, bot_response):
+        """
+        Add a turn to a session and queue it to be saved.
+
+        Args:
+            session_id (str): The chat session identifier
+            user_message (str): What the user said
+            bot_response (str): What the bot answered
+        """
+        with self._lock:
+            turns = self._sessions.get(session_id)
+            if turns is None:
+                turns = self._sessions[session_id] = deque(maxlen=self.max_turns)
+            else:
+                self._sessions.move_to_end(session_id)
+            turns.append((user_message, bot_response))
+
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+            if len(self._pending) == self._pending.maxlen:
+                logger.warning('Chat history queue is full, dropping the oldest turn.')
+            self._pending.append((session_id, user_message, bot_response, timezone.now()))
+
+        if self.async_flush:
+            self._start_writer()
+
+    def clear(self):
+        """
+        Drop every cached session and any turns not yet saved.
+        """
+        with self._lock:
+            self._sessions.clear()
+            self._pending.clear()
+
+    def flush(self):
+        """
+        Save all queued turns to the database.
+
+        Returns:
+            int: Number of messages written
+        """
+        from .models import ChatMessage, ChatSession
+
+        with self._lock:
+            batch = list(self._pending)
+            self._pending.clear()
+
+        if not batch:
+            return 0
+
+        try:
+            session_ids = {session_id for session_id, _, _, _ in batch}
+            with transaction.atomic():
+                sessions = {
+                    session.session_id: session
+                    for session in ChatSession.objects.filter(session_id__in=session_ids)
+                }
+                missing = session_ids - sessions.keys()
+                if missing:
+                    ChatSession.objects.bulk_create(
+                        [ChatSession(session_id=session_id) for session_id in missing],
+                        ignore_conflicts=True
+                    )
+                    for session in ChatSession.objects.filter(session_id__in=missing):
+                        sessions[session.session_id] = session
+
+                ChatMessage.objects.bulk_create([
+                    ChatMessage(
+                        session=sessions.get(session_id),
+                        user_message=user_message,
+                        bot_response=bot_response,
+                        timestamp=timestamp
+                    )
+                    for session_id, user_message, bot_response, timestamp in batch
+                ])
+        except Exception:
+            logger.exception('Could not save chat history, will retry.')
+            with self._lock:
+                # Put the batch back in front of anything queued since,
+                # dropping the oldest turns if that overflows the queue
+                queued = batch + list(self._pending)
+                overflow = len(queued) - self._pending.maxlen
+                if overflow > 0:
+                    logger.warning('Chat history queue is full, dropping the %d oldest turns.', overflow)
+                    queued = queued[overflow:]
+                self._pending.clear()
+                self._pending.extend(queued)
+            return 0
+
+        return len(batch)
+
+    def _start_writer(self):
+        """
+        Start the background writer thread if it is not running.
+        """
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(
+                target=self._run_writer,
+                name='chatbot-history-writer',
+                daemon=True
+            )
+            self._writer.start()
+
+    def _run_writer(self):
+        """
+        Flush queued turns every flush_interval seconds.
+        """
+        while True:
+            time.sleep(self.flush_interval)
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+def create_context_cache():
+    """
+    Create a context cache configured from Django settings.
+
+    Returns:
+        ConversationContextCache: Configured cache instance
+    """
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, 'CHATBOT_CONTEXT_CACHE', {}))
+
+    return ConversationContextCache(
+        max_turns=options['MAX_TURNS_PER_SESSION'],
+        max_sessions=options['MAX_SESSIONS'],
+        max_pending=options['MAX_PENDING'],
+        flush_interval=options['FLUSH_INTERVAL'],
+        async_flush=options['ASYNC_FLUSH'],
+    )
+
+
+# Shared cache used by the views and the bot
+conversation_cache = create_context_cache()
+
+# Save whatever is still queued when the process exits
+atexit.register(conversation_cache.flush)
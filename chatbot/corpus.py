@@ -0,0 +1,239 @@
+"""
+Streaming import and export of training data as JSONL.
+
+Each line of a corpus file is one JSON object, in one of two forms:
+
+    {"conversation": ["Hello", "Hi there!", "How are you?"]}
+    {"text": "Hi there!", "in_response_to": "Hello", "tags": ["greeting"]}
+
+The first is a conversation, where every line answers the previous
+one, like the lists passed to ListTrainer. The second is a single
+statement, which is also the format written by export_corpus().
+Files ending in .gz are gzip-compressed.
+
+Everything is processed as a chain of generators and saved in
+batches, so memory use stays the same however large the file is.
+"""
+
+import gzip
+import json
+from itertools import islice
+
+from chatterbot.conversation import Statement
+
+# Statement fields that are read from and written to corpus files
+STATEMENT_FIELDS = (
+    'text',
+    'in_response_to',
+    'conversation',
+    'persona',
+    'tags',
+    'search_text',
+    'search_in_response_to',
+    'created_at',
+)
+
+
+def open_corpus(path, mode='rt'):
+    """
+    Open a corpus file, using gzip if the name ends in .gz.
+
+    Args:
+        path (str): Path to the corpus file
+        mode (str): 'rt' to read or 'wt' to write
+
+    Returns:
+        file: Text file object
+    """
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def batched(iterable, size):
+    """
+    Yield lists of up to size items from an iterable.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def read_records(path):
+    """
+    Yield each JSON object in a corpus file.
+
+    Args:
+        path (str): Path to the corpus file
+
+    Raises:
+        ValueError: If a line is not a JSON object
+    """
+    with open_corpus(path) as corpus_file:
+        for line_number, line in enumerate(corpus_file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ValueError(f'{path}, line {line_number}: {error}') from error
+            if not isinstance(record, dict):
+                raise ValueError(f'{path}, line {line_number}: expected a JSON object')
+            yield record
+
+
+def expand_records(records):
+    """
+    Turn corpus records into statement dictionaries.
+
+    Conversations are expanded into one statement per line,
+    each in response to the line before it.
+    """
+    for record in records:
+        if 'conversation' in record and isinstance(record['conversation'], list):
+            previous_text = None
+            for text in record['conversation']:
+                yield {
+                    'text': text,
+                    'in_response_to': previous_text,
+                    'conversation': record.get('label', 'training'),
+                    'tags': record.get('tags', []),
+                }
+                previous_text = text
+        elif 'text' in record:
+            yield {field: record[field] for field in STATEMENT_FIELDS if field in record}
+        else:
+            raise ValueError(f'Corpus record has neither "conversation" nor "text": {record!r}')
+
+
+def preprocess_text(chatbot, text):
+    """
+    Return text the way the chatbot's preprocessors would store it.
+    """
+    statement = Statement(text=text)
+    for preprocessor in chatbot.preprocessors:
+        statement = preprocessor(statement)
+    return statement.text
+
+
+def build_statements(statement_data, chatbot, batch_size=1000):
+    """
+    Create Statement objects, filling in missing search text in batches.
+
+    Like ListTrainer, the text and in_response_to of each statement are
+    preprocessed first, so a response still points at the stored text
+    of its prompt, and the search text is built from preprocessed text.
+    The tagger is run over a whole batch of texts at once, which is
+    much faster than tagging each statement on its own.
+    """
+    for batch in batched(statement_data, batch_size):
+        # In a conversation each text is also the next line's in_response_to
+        preprocessed = {}
+        for data in batch:
+            for field in ('text', 'in_response_to'):
+                text = data.get(field)
+                if text:
+                    if text not in preprocessed:
+                        preprocessed[text] = preprocess_text(chatbot, text)
+                    data[field] = preprocessed[text]
+
+        missing_search_text = [data['text'] for data in batch if not data.get('search_text')]
+        missing_search_in_response_to = [
+            data['in_response_to'] for data in batch
+            if data.get('in_response_to') and not data.get('search_in_response_to')
+        ]
+
+        search_texts = iter(chatbot.tagger.get_text_index_string(missing_search_text)) \
+            if missing_search_text else iter(())
+        search_in_response_tos = iter(chatbot.tagger.get_text_index_string(missing_search_in_response_to)) \
+            if missing_search_in_response_to else iter(())
+
+        for data in batch:
+            if not data.get('search_text'):
+                data['search_text'] = next(search_texts)
+            if data.get('in_response_to') and not data.get('search_in_response_to'):
+                data['search_in_response_to'] = next(search_in_response_tos)
+
+            yield Statement(**data)
+
+
+def import_corpus(chatbot, path, batch_size=1000):
+    """
+    Load a JSONL corpus file into the chatbot's storage.
+
+    Args:
+        chatbot (ChatBot): The chatbot to train
+        path (str): Path to a .jsonl or .jsonl.gz file
+        batch_size (int): Number of statements saved per commit
+
+    Returns:
+        int: Number of statements imported
+    """
+    statements = build_statements(expand_records(read_records(path)), chatbot, batch_size)
+
+    total = 0
+    for batch in batched(statements, batch_size):
+        chatbot.storage.create_many(batch)
+        total += len(batch)
+    return total
+
+
+def iter_stored_statements(storage, batch_size=1000):
+    """
+    Yield every statement in storage as a dictionary.
+
+    Statements are read in id order with keyset pagination and their
+    tags are loaded per batch, so neither memory nor query cost grows
+    with the size of the table.
+    """
+    from sqlalchemy.orm import selectinload
+
+    Statement = storage.get_model('statement')
+    last_id = 0
+
+    while True:
+        session = storage.Session()
+        try:
+            rows = (
+                session.query(Statement)
+                .options(selectinload(Statement.tags))
+                .filter(Statement.id > last_id)
+                .order_by(Statement.id)
+                .limit(batch_size)
+                .all()
+            )
+            batch = [row.serialize() for row in rows]
+        finally:
+            session.close()
+
+        if not batch:
+            return
+        last_id = batch[-1]['id']
+        yield from batch
+
+
+def export_corpus(chatbot, path, batch_size=1000):
+    """
+    Write every statement in the chatbot's storage to a JSONL file.
+
+    Args:
+        chatbot (ChatBot): The chatbot to export
+        path (str): Path to a .jsonl or .jsonl.gz file
+        batch_size (int): Number of statements read per query
+
+    Returns:
+        int: Number of statements exported
+    """
+    total = 0
+    with open_corpus(path, 'wt') as corpus_file:
+        for data in iter_stored_statements(chatbot.storage, batch_size):
+            record = {field: data.get(field) for field in STATEMENT_FIELDS}
+            if record['created_at'] is not None:
+                record['created_at'] = record['created_at'].isoformat()
+            corpus_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            total += 1
+    return total
@@ -0,0 +1,400 @@
+"""
+Custom logic adapters for the chatbot.
+
+This module contains a typo-tolerant matcher that finds known
+statements within a small edit distance of the user's message.
+It uses a BK-tree so that each lookup only visits a fraction of
+the known statements instead of comparing against all of them.
+"""
+
+import os
+import pickle
+import re
+import threading
+import time
+
+from chatterbot.logic import BestMatch
+from sqlalchemy import func
+
+from .context import conversation_cache
+
+
+# Bump this when the on-disk index layout changes
+INDEX_FORMAT_VERSION = 2
+
+
+def normalize_text(text):
+    """
+    Normalize text before it is indexed or looked up.
+
+    Lowercases the text, removes punctuation and collapses whitespace
+    so that "Hello!" and "hello" are treated as the same key.
+
+    Args:
+        text (str): The text to normalize
+
+    Returns:
+        str: Normalized text
+    """
+    text = re.sub(r'[^\w\s]', '', text.lower())
+    return ' '.join(text.split())
+
+
+def edit_distance(a, b):
+    """
+    Calculate the Levenshtein distance between two strings.
+
+    Args:
+        a (str): First string
+        b (str): Second string
+
+    Returns:
+        int: Number of single character edits needed to turn a into b
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """
+    A BK-tree (Burkhard-Keller tree) of normalized statement texts.
+
+    Each node holds a key, the original texts that normalize to that
+    key, and its children indexed by their edit distance to the key.
+    The triangle inequality lets a search skip every child whose
+    distance lies outside [d - max_distance, d + max_distance].
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, text):
+        """
+        Add a statement text to the tree.
+
+        Args:
+            text (str): The original statement text
+        """
+        key = normalize_text(text)
+
+        if self.root is None:
+            # Nodes are [key, texts, children] lists to keep pickles small
+            self.root = [key, [text], {}]
+            self.size += 1
+            return
+
+        node = self.root
+        while True:
+            distance = edit_distance(key, node[0])
+            if distance == 0:
+                if text not in node[1]:
+                    node[1].append(text)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, [text], {}]
+                self.size += 1
+                return
+            node = child
+
+    def search(self, text, max_distance):
+        """
+        Find all indexed texts within max_distance edits of text.
+
+        Args:
+            text (str): The text to look up
+            max_distance (int): Largest edit distance to accept
+
+        Returns:
+            list: (distance, original_text) tuples sorted by distance
+        """
+        if self.root is None:
+            return []
+
+        key = normalize_text(text)
+        results = []
+        stack = [self.root]
+
+        while stack:
+            node = stack.pop()
+            distance = edit_distance(key, node[0])
+            if distance <= max_distance:
+                results.extend((distance, original) for original in node[1])
+
+            low = distance - max_distance
+            high = distance + max_distance
+            for child_distance, child in node[2].items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+
+        results.sort(key=lambda result: result[0])
+        return results
+
+    def __len__(self):
+        return self.size
+
+
+class TypoTolerantMatch(BestMatch):
+    """
+    A BestMatch adapter that looks messages up in a BK-tree first.
+
+    Known prompts (statements that other statements respond to) are
+    kept in a BK-tree. The closest prompt within the allowed edit
+    distance, including an exact match, is used to look up a response
+    from storage. Only messages with no such prompt fall back to
+    BestMatch's comparison against every candidate.
+
+    :param maximum_edit_distance: Largest number of edits to tolerate.
+        Defaults to 3.
+    :param index_path: File used to persist the BK-tree between runs.
+        Defaults to None, which keeps the index in memory only.
+    :param index_refresh_interval: Seconds between checks for prompts
+        learned since the index was loaded. Defaults to 5.
+    """
+
+    def __init__(self, chatbot, **kwargs):
+        super().__init__(chatbot, **kwargs)
+
+        self.maximum_edit_distance = kwargs.get('maximum_edit_distance', 3)
+        self.index_path = kwargs.get('index_path')
+        self.index_refresh_interval = kwargs.get('index_refresh_interval', 5)
+        self.tree = None
+        self.watermark = 0
+        self.refreshed_at = None
+        self._lock = threading.Lock()
+
+    def get_watermark(self):
+        """
+        Return the highest statement id in storage, or 0 if it is empty.
+
+        Statements are only ever added, so this is a cheap way to tell
+        whether the index has fallen behind the stored prompts.
+        """
+        Statement = self.chatbot.storage.get_model('statement')
+        session = self.chatbot.storage.Session()
+        try:
+            return session.query(func.max(Statement.id)).scalar() or 0
+        finally:
+            session.close()
+
+    def get_known_prompts(self, after_id=0, up_to_id=None):
+        """
+        Return the distinct texts that stored statements respond to.
+
+        Args:
+            after_id (int): Only include statements with a higher id
+            up_to_id (int): Only include statements up to this id
+
+        Returns:
+            list: Sorted list of prompt texts
+        """
+        Statement = self.chatbot.storage.get_model('statement')
+        session = self.chatbot.storage.Session()
+        try:
+            rows = session.query(Statement.in_response_to).filter(
+                Statement.in_response_to.isnot(None),
+                Statement.id > after_id
+            )
+            if up_to_id is not None:
+                rows = rows.filter(Statement.id <= up_to_id)
+            return sorted(row[0] for row in rows.distinct())
+        finally:
+            session.close()
+
+    def load_index(self, watermark):
+        """
+        Load the BK-tree from disk, or build it if it is missing.
+
+        The persisted index records the highest statement id it covers,
+        so only prompts stored after that are added when it is loaded.
+        If storage has been reset since, the index is rebuilt.
+
+        Args:
+            watermark (int): Highest statement id currently in storage
+
+        Returns:
+            BKTree: The loaded or rebuilt tree
+        """
+        if self.index_path and os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'rb') as index_file:
+                    data = pickle.load(index_file)
+                if (data.get('version') == INDEX_FORMAT_VERSION
+                        and data.get('watermark', watermark + 1) <= watermark):
+                    tree = data['tree']
+                    new_prompts = self.get_known_prompts(data['watermark'], watermark)
+                    for prompt in new_prompts:
+                        tree.add(prompt)
+                    if new_prompts:
+                        self.save_index(tree, watermark)
+                    self.chatbot.logger.info('Loaded typo index from %s', self.index_path)
+                    return tree
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                self.chatbot.logger.warning('Could not read typo index, rebuilding it.')
+
+        tree = BKTree()
+        for prompt in self.get_known_prompts(up_to_id=watermark):
+            tree.add(prompt)
+
+        if self.index_path:
+            self.save_index(tree, watermark)
+
+        return tree
+
+    def save_index(self, tree, watermark):
+        """
+        Write the BK-tree to disk atomically.
+
+        Args:
+            tree (BKTree): The tree to persist
+            watermark (int): Highest statement id the tree covers
+        """
+        temporary_path = self.index_path + '.tmp'
+        try:
+            with open(temporary_path, 'wb') as index_file:
+                pickle.dump({
+                    'version': INDEX_FORMAT_VERSION,
+                    'watermark': watermark,
+                    'tree': tree,
+                }, index_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, self.index_path)
+        except OSError:
+            self.chatbot.logger.warning('Could not save typo index to %s', self.index_path)
+
+    def refresh_index(self):
+        """
+        Load the BK-tree the first time, then add newly learned prompts.
+
+        Storage is checked for new prompts at most once every
+        index_refresh_interval seconds, so new conversations can be
+        matched without a restart. They are persisted the next time a
+        process loads the index. Must be called with the lock held.
+        """
+        now = time.monotonic()
+        if self.tree is not None and now - self.refreshed_at < self.index_refresh_interval:
+            return
+
+        watermark = self.get_watermark()
+        if self.tree is None:
+            self.tree = self.load_index(watermark)
+        elif watermark > self.watermark:
+            for prompt in self.get_known_prompts(self.watermark, watermark):
+                self.tree.add(prompt)
+        self.watermark = watermark
+        self.refreshed_at = now
+
+    def get_index(self):
+        """
+        Return the BK-tree, loading or refreshing it if needed.
+        """
+        with self._lock:
+            self.refresh_index()
+            return self.tree
+
+    def search_index(self, text, max_distance):
+        """
+        Search the BK-tree while holding the lock.
+
+        Prompts are added to the tree while other threads search it,
+        so searching without the lock could see a node's children
+        change size mid-iteration.
+
+        Returns:
+            list: (distance, prompt) tuples sorted by distance
+        """
+        with self._lock:
+            self.refresh_index()
+            return self.tree.search(text, max_distance)
+
+    def get_distance_bound(self, text):
+        """
+        Scale the allowed edit distance with the length of the input.
+
+        Short messages only tolerate one edit so "hi" does not match "ok".
+        """
+        return max(1, min(self.maximum_edit_distance, len(normalize_text(text)) // 4))
+
+    def get_recent_responses(self, conversation):
+        """
+        Return what the bot has said recently in a conversation.
+
+        The chat session ID is used as the conversation, so the turns
+        come from the in-memory context cache rather than the database.
+
+        Args:
+            conversation (str): The conversation of the input statement
+
+        Returns:
+            set: Recent response texts
+        """
+        if not conversation:
+            return set()
+        return {bot_response for _, bot_response in conversation_cache.get_context(conversation)}
+
+    def process(self, input_statement, additional_response_selection_parameters=None):
+        """
+        Return a response for the closest known prompt within the edit bound.
+
+        Responses the bot already gave in the recent turns of the
+        conversation are skipped when another response is available.
+        When no known prompt is close enough, BestMatch is used instead.
+        """
+        text = input_statement.text
+        key = normalize_text(text)
+
+        if not key:
+            return super().process(input_statement, additional_response_selection_parameters)
+
+        recent_responses = self.get_recent_responses(input_statement.conversation)
+
+        matches = self.search_index(text, self.get_distance_bound(text))
+
+        for distance, prompt in matches:
+            response_selection_parameters = {
+                'in_response_to': prompt,
+                'persona_not_startswith': 'bot:',
+            }
+            if additional_response_selection_parameters:
+                response_selection_parameters.update(
+                    additional_response_selection_parameters
+                )
+
+            response_list = list(self.chatbot.storage.filter(**response_selection_parameters))
+            if not response_list:
+                continue
+
+            fresh_responses = [
+                statement for statement in response_list
+                if statement.text not in recent_responses
+            ]
+
+            response = self.select_response(
+                input_statement,
+                fresh_responses or response_list,
+                self.chatbot.storage
+            )
+            response.confidence = 1 - distance / max(len(key), len(normalize_text(prompt)))
+
+            self.chatbot.logger.info('Matched "{}" to known prompt "{}" at distance {}'.format(
+                text, prompt, distance
+            ))
+            return response
+
+        return super().process(input_statement, additional_response_selection_parameters)
@@ -0,0 +1,36 @@
+"""
+Management command to export the response snapshot.
+
+Usage:
+    python manage.py build_response_snapshot
+    python manage.py build_response_snapshot --output /srv/chatbot/responses.snapshot
+
+Running workers keep using the snapshot they mapped at startup,
+restart them to pick up the new one.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the memory-mapped response snapshot from the chatbot's storage.
+    """
+    help = 'Export known prompts and responses to the CHATBOT_RESPONSE_SNAPSHOT file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='File to write instead of the CHATBOT_RESPONSE_SNAPSHOT setting.'
+        )
+
+    def handle(self, *args, **options):
+        from chatbot.bot import SNAPSHOT_PATH, rebuild_snapshot
+
+        path = options['output'] or SNAPSHOT_PATH
+        try:
+            prompts = rebuild_snapshot(path)
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {prompts} prompt(s) to {path}.'))
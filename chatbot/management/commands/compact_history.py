@@ -0,0 +1,42 @@
+"""
+Management command to apply the chat history retention policy.
+
+Usage:
+    python manage.py compact_history
+    python manage.py compact_history --dry-run
+    python manage.py compact_history --table chatmessage
+"""
+
+from django.core.management.base import BaseCommand
+
+from chatbot.retention import compact_history
+
+
+class Command(BaseCommand):
+    """
+    Roll up, archive and delete chat history older than the policy allows.
+    """
+    help = 'Roll up, archive and delete old chat history using CHATBOT_RETENTION.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table',
+            action='append',
+            choices=['chatmessage', 'chatsession'],
+            help='Only compact this table (can be given more than once).'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the rows that would be removed without changing anything.'
+        )
+
+    def handle(self, *args, **options):
+        results = compact_history(
+            tables=options['table'],
+            dry_run=options['dry_run'],
+            log=self.stdout.write
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Done, {sum(results.values())} row(s) processed.'
+        ))
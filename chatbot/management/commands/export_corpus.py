@@ -0,0 +1,36 @@
+"""
+Management command to dump the chatbot's statements to a JSONL file.
+
+Usage:
+    python manage.py export_corpus statements.jsonl
+    python manage.py export_corpus statements.jsonl.gz
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Stream every stored statement to a JSONL corpus file.
+    """
+    help = 'Export all learned statements to a .jsonl or .jsonl.gz file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Corpus file to write.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of statements read per query (default: 1000).'
+        )
+
+    def handle(self, *args, **options):
+        from chatbot.bot import chatbot
+        from chatbot.corpus import export_corpus
+
+        try:
+            total = export_corpus(chatbot, options['path'], options['batch_size'])
+        except OSError as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(self.style.SUCCESS(f'Exported {total} statement(s).'))
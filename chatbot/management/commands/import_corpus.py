@@ -0,0 +1,36 @@
+"""
+Management command to train the chatbot from a JSONL corpus file.
+
+Usage:
+    python manage.py import_corpus conversations.jsonl
+    python manage.py import_corpus conversations.jsonl.gz --batch-size 5000
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Stream a JSONL corpus file into the chatbot's storage.
+    """
+    help = 'Import conversations and statements from a .jsonl or .jsonl.gz file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Corpus file to import.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of statements saved per commit (default: 1000).'
+        )
+
+    def handle(self, *args, **options):
+        from chatbot.bot import chatbot
+        from chatbot.corpus import import_corpus
+
+        try:
+            total = import_corpus(chatbot, options['path'], options['batch_size'])
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {total} statement(s).'))
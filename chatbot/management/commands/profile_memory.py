@@ -0,0 +1,92 @@
+"""
+Management command to measure the chatbot's memory footprint.
+
+Usage:
+    python manage.py profile_memory
+    python manage.py profile_memory --requests 500 --read-only
+"""
+
+import sys
+from itertools import cycle
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.profiling import MemoryProfiler, format_report
+
+# Messages sent to the bot while measuring growth across requests
+SAMPLE_MESSAGES = [
+    'Hello',
+    'How are you?',
+    'What is your name?',
+    'What can you do?',
+    'Tell me a joke',
+    'What is Django?',
+    'Thank you',
+    'Goodbye',
+]
+
+
+class Command(BaseCommand):
+    """
+    Report memory by component at startup, after training and after N requests.
+    """
+    help = 'Profile memory use of the chatbot with tracemalloc and RSS sampling.'
+
+    # The system checks import the URLconf, which imports chatbot.bot and
+    # trains the bot before tracing could start
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Number of messages to send to the bot (default: 200).'
+        )
+        parser.add_argument(
+            '--sample-every',
+            type=int,
+            default=10,
+            help='Sample memory every this many requests (default: 10).'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=int,
+            default=1024,
+            help='Growth in bytes per request reported as a leak (default: 1024).'
+        )
+        parser.add_argument(
+            '--read-only',
+            action='store_true',
+            help='Do not let the bot learn from the sample messages.'
+        )
+
+    def handle(self, *args, **options):
+        if 'chatbot.bot' in sys.modules:
+            raise CommandError('The chatbot was created before profiling started, '
+                               'so its memory cannot be measured.')
+
+        profiler = MemoryProfiler()
+        profiler.stage('startup')
+
+        # Importing the bot module creates and trains the global chatbot,
+        # now that every allocation it makes is traced
+        from chatbot import bot
+        profiler.stage('after training')
+
+        bot.chatbot.read_only = options['read_only']
+        messages = cycle(SAMPLE_MESSAGES)
+
+        # The first request warms up caches, so it is not counted as growth
+        bot.get_bot_response(next(messages))
+        profiler.stage('after first request')
+
+        for count in range(1, options['requests'] + 1):
+            bot.get_bot_response(next(messages))
+            if count % options['sample_every'] == 0:
+                profiler.sample(count)
+
+        profiler.stage(f"after {options['requests']} requests", set_baseline=False)
+
+        for line in format_report(profiler.report(threshold=options['threshold'])):
+            self.stdout.write(line)
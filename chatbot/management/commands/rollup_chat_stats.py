@@ -0,0 +1,38 @@
+"""
+Management command to precompute daily chat statistics.
+
+Usage:
+    python manage.py rollup_chat_stats
+    python manage.py rollup_chat_stats --days 90
+"""
+
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from chatbot.analytics import rollup_daily_stats
+
+
+class Command(BaseCommand):
+    """
+    Roll ChatMessage rows up into DailyChatStats.
+    """
+    help = 'Precompute daily chat statistics for the admin analytics page.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Number of days to recompute, counting back from today (default: 2).'
+        )
+
+    def handle(self, *args, **options):
+        end_date = timezone.localdate() + datetime.timedelta(days=1)
+        start_date = end_date - datetime.timedelta(days=options['days'])
+
+        days = rollup_daily_stats(start_date, end_date)
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated stats for {days} day(s) from {start_date} to {end_date}.'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailychatstats',
+            name='is_final',
+            field=models.BooleanField(default=False),
+        ),
+    ]
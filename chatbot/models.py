@@ -38,10 +38,33 @@ class ChatMessage(models.Model):
     session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, null=True, blank=True)
     user_message = models.TextField()
     bot_response = models.TextField()
-    timestamp = models.DateTimeField(default=timezone.now)
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
 
     class Meta:
         ordering = ['timestamp']
 
     def __str__(self):
-        return f"Message at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"Message at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+class DailyChatStats(models.Model):
+    """
+    Model to store precomputed chat statistics for one day.
+
+    Rows are filled in by the rollup_chat_stats management command,
+    so analytics pages never have to aggregate ChatMessage directly.
+    A day is marked final once its messages may have been archived,
+    after which it is never recomputed.
+    """
+    date = models.DateField(unique=True)
+    message_count = models.PositiveIntegerField(default=0)
+    session_count = models.PositiveIntegerField(default=0)
+    is_final = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'Daily chat stats'
+
+    def __str__(self):
+        return f"Chat stats for {self.date.isoformat()}"
@@ -0,0 +1,322 @@
+"""
+Memory profiling for the chatbot serving process.
+
+This module combines tracemalloc snapshots with resident set size
+(RSS) samples to show how much memory each part of the process uses
+(ChatterBot, SQLAlchemy, the spaCy tagger models, the training
+corpus, Django) and whether memory keeps growing as requests are
+served, which usually points to a leak in the learning path.
+"""
+
+import linecache
+import os
+import threading
+import tracemalloc
+from collections import deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+# Path fragments used to attribute allocations to a component,
+# checked in order so the first match wins
+COMPONENTS = (
+    ('chatbot app', (os.sep + 'chatbot' + os.sep,)),
+    ('corpus', ('chatterbot_corpus', os.sep + 'yaml' + os.sep)),
+    ('chatterbot', (os.sep + 'chatterbot' + os.sep,)),
+    ('sqlalchemy', (os.sep + 'sqlalchemy' + os.sep,)),
+    ('tagger models', (os.sep + 'spacy', os.sep + 'thinc' + os.sep, os.sep + 'numpy' + os.sep,
+                       os.sep + 'srsly' + os.sep, os.sep + 'cymem' + os.sep, os.sep + 'preshed' + os.sep)),
+    ('django', (os.sep + 'django' + os.sep,)),
+)
+
+# Default growth per request, in bytes, above which a leak is reported
+DEFAULT_GROWTH_THRESHOLD = 1024
+
+
+def get_rss():
+    """
+    Return the current resident set size of this process in bytes.
+
+    Reads /proc on Linux. Elsewhere the peak RSS from getrusage is
+    used, which can only go up but is still useful for spotting growth.
+
+    Returns:
+        int: Resident memory in bytes, or None if it cannot be read
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+        import sys
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def take_snapshot():
+    """
+    Take a tracemalloc snapshot without tracemalloc's own allocations.
+    """
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+    ))
+
+
+def component_for_filename(filename):
+    """
+    Return the name of the component a source file belongs to.
+
+    Args:
+        filename (str): Path of the file that made an allocation
+
+    Returns:
+        str: Component name, or 'other'
+    """
+    for component, fragments in COMPONENTS:
+        if any(fragment in filename for fragment in fragments):
+            return component
+    return 'other'
+
+
+def breakdown_by_component(snapshot):
+    """
+    Add up the traced memory of a snapshot for each component.
+
+    Args:
+        snapshot (Snapshot): A tracemalloc snapshot
+
+    Returns:
+        dict: Bytes allocated per component, largest first
+    """
+    totals = {}
+    for stat in snapshot.statistics('filename'):
+        component = component_for_filename(stat.traceback[0].filename)
+        totals[component] = totals.get(component, 0) + stat.size
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def format_bytes(size):
+    """
+    Format a number of bytes for people to read, e.g. 12.3 MiB.
+    """
+    if size is None:
+        return 'n/a'
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return f'{size:.1f} {unit}' if unit != 'B' else f'{size} B'
+        size /= 1024
+    return f'{size:.1f} GiB'
+
+
+def growth_per_request(samples):
+    """
+    Estimate how many bytes memory grows per request.
+
+    Fits a least-squares line through (request_count, bytes) samples,
+    so a single spike does not look like a leak.
+
+    Args:
+        samples (list): (request_count, bytes) tuples
+
+    Returns:
+        float: Slope in bytes per request, 0 if there are too few samples
+    """
+    if len(samples) < 2:
+        return 0.0
+    count = len(samples)
+    mean_x = sum(x for x, _ in samples) / count
+    mean_y = sum(y for _, y in samples) / count
+    variance = sum((x - mean_x) ** 2 for x, _ in samples)
+    if not variance:
+        return 0.0
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in samples)
+    return covariance / variance
+
+
+class MemoryProfiler:
+    """
+    Records memory usage at named stages and while serving requests.
+
+    Call stage() at interesting points (startup, after training...)
+    and sample() every few requests. report() puts it all together.
+    """
+
+    def __init__(self, max_samples=500, frames=1):
+        self.frames = frames
+        self.stages = []
+        self.samples = deque(maxlen=max_samples)
+        self.baseline = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Start tracemalloc if it is not already tracing.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stage(self, name, set_baseline=True):
+        """
+        Record the memory breakdown at a named point.
+
+        Args:
+            name (str): Name of the stage, e.g. 'after training'
+            set_baseline (bool): Measure later growth from this point
+        """
+        self.start()
+        snapshot = take_snapshot()
+        traced, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            self.stages.append({
+                'name': name,
+                'rss': get_rss(),
+                'traced': traced,
+                'peak': peak,
+                'components': breakdown_by_component(snapshot),
+            })
+            if set_baseline:
+                self.baseline = snapshot
+
+    def sample(self, request_count):
+        """
+        Record traced memory and RSS after request_count requests.
+        """
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        with self._lock:
+            self.samples.append((request_count, traced, get_rss()))
+
+    def top_growth(self, limit=10):
+        """
+        Return the source lines whose allocations grew the most.
+
+        Returns:
+            list: (location, size_diff, count_diff) tuples
+        """
+        if self.baseline is None or not tracemalloc.is_tracing():
+            return []
+        current = take_snapshot()
+        growth = []
+        for stat in current.compare_to(self.baseline, 'lineno')[:limit]:
+            frame = stat.traceback[0]
+            line = linecache.getline(frame.filename, frame.lineno).strip()
+            growth.append((f'{frame.filename}:{frame.lineno} {line}', stat.size_diff, stat.count_diff))
+        return growth
+
+    def report(self, threshold=DEFAULT_GROWTH_THRESHOLD):
+        """
+        Return everything recorded so far as a dictionary.
+
+        Args:
+            threshold (int): Growth in bytes per request that is flagged
+
+        Returns:
+            dict: Stages, growth estimates and whether a leak is suspected
+        """
+        with self._lock:
+            stages = list(self.stages)
+            samples = list(self.samples)
+
+        traced_growth = growth_per_request([(n, traced) for n, traced, _ in samples if traced is not None])
+        rss_growth = growth_per_request([(n, rss) for n, _, rss in samples if rss is not None])
+
+        return {
+            'stages': stages,
+            'requests': samples[-1][0] if samples else 0,
+            'traced_growth_per_request': traced_growth,
+            'rss_growth_per_request': rss_growth,
+            'leak_suspected': traced_growth > threshold,
+            'top_growth': self.top_growth(),
+        }
+
+
+def format_report(report):
+    """
+    Turn a profiler report into lines of text for the terminal.
+
+    Args:
+        report (dict): Output of MemoryProfiler.report()
+
+    Returns:
+        list: Lines of text
+    """
+    lines = []
+    for stage in report['stages']:
+        lines.append(f"== {stage['name']}: RSS {format_bytes(stage['rss'])}, "
+                     f"traced {format_bytes(stage['traced'])} (peak {format_bytes(stage['peak'])})")
+        for component, size in stage['components'].items():
+            lines.append(f'   {component:<15} {format_bytes(size):>12}')
+
+    if report['requests']:
+        lines.append(f"== Growth over {report['requests']} requests: "
+                     f"traced {format_bytes(int(report['traced_growth_per_request']))}/request, "
+                     f"RSS {format_bytes(int(report['rss_growth_per_request']))}/request")
+        if report['leak_suspected']:
+            lines.append('   WARNING: memory keeps growing, a leak is likely. Largest increases:')
+            for location, size_diff, count_diff in report['top_growth']:
+                lines.append(f'   {format_bytes(size_diff):>12} {count_diff:+d} blocks  {location}')
+    return lines
+
+
+# Shared profiler used by the middleware and the debug endpoint
+profiler = MemoryProfiler()
+
+
+def is_profiling_enabled():
+    """
+    Return whether CHATBOT_MEMORY_PROFILING is enabled in settings.
+    """
+    return getattr(settings, 'CHATBOT_MEMORY_PROFILING', False)
+
+
+def record_stage(name):
+    """
+    Record a stage on the shared profiler if profiling is enabled.
+
+    Args:
+        name (str): Name of the stage, e.g. 'after training'
+    """
+    if is_profiling_enabled():
+        profiler.stage(name)
+
+
+class MemorySamplingMiddleware:
+    """
+    Samples memory every few requests while profiling is enabled.
+
+    Enable it with CHATBOT_MEMORY_PROFILING = True in settings.
+    Otherwise Django removes it from the stack at startup.
+    CHATBOT_MEMORY_SAMPLE_EVERY sets how often to sample.
+
+    Tracing starts when the chatbot app is ready, so the 'server ready'
+    stage shows what was loaded since then.
+    """
+
+    def __init__(self, get_response):
+        if not is_profiling_enabled():
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.sample_every = getattr(settings, 'CHATBOT_MEMORY_SAMPLE_EVERY', 10)
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+        profiler.stage('server ready')
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        with self._lock:
+            self.request_count += 1
+            count = self.request_count
+        if count % self.sample_every == 0:
+            profiler.sample(count)
+
+        return response
@@ -0,0 +1,222 @@
+"""
+Retention, rollup and archival of chat history.
+
+Old ChatMessage rows are first rolled up into DailyChatStats, then
+written to gzip-compressed JSONL archives and deleted in small batches.
+Each batch is its own short transaction, so SQLite is never write
+locked for long and memory use does not depend on the table size.
+"""
+
+import datetime
+import gzip
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .analytics import rollup_daily_stats
+from .models import ChatMessage, ChatSession
+
+# Default policy, override with the CHATBOT_RETENTION setting.
+# KEEP_DAYS of None keeps a table's rows forever.
+DEFAULT_RETENTION = {
+    'ARCHIVE_DIR': 'archive',
+    'BATCH_SIZE': 500,
+    'BATCH_PAUSE': 0.05,
+    'TABLES': {
+        'chatmessage': {'KEEP_DAYS': 90, 'ARCHIVE': True},
+        'chatsession': {'KEEP_DAYS': 90, 'ARCHIVE': True},
+    },
+}
+
+
+def get_retention_settings():
+    """
+    Return the retention settings merged over the defaults.
+
+    Returns:
+        dict: Retention settings with a policy for every table
+    """
+    options = dict(DEFAULT_RETENTION)
+    options.update(getattr(settings, 'CHATBOT_RETENTION', {}))
+
+    tables = {name: dict(policy) for name, policy in DEFAULT_RETENTION['TABLES'].items()}
+    for name, policy in options.get('TABLES', {}).items():
+        tables.setdefault(name, {}).update(policy)
+    options['TABLES'] = tables
+    return options
+
+
+def get_cutoff(keep_days):
+    """
+    Return the start of the day keep_days ago, in the current timezone.
+
+    Cutting off on a day boundary means a day is never half archived,
+    so its rolled up stats stay correct.
+    """
+    cutoff_date = timezone.localdate() - datetime.timedelta(days=keep_days)
+    return timezone.make_aware(
+        datetime.datetime.combine(cutoff_date, datetime.time.min),
+        timezone.get_current_timezone()
+    )
+
+
+def get_expired_queryset(table, cutoff):
+    """
+    Return the rows of a table that are older than the cutoff.
+
+    Sessions only expire once none of their messages are left.
+
+    Args:
+        table (str): 'chatmessage' or 'chatsession'
+        cutoff (datetime): Rows older than this expire
+
+    Returns:
+        QuerySet: Expired rows
+    """
+    if table == 'chatmessage':
+        return ChatMessage.objects.filter(timestamp__lt=cutoff)
+    if table == 'chatsession':
+        return ChatSession.objects.filter(updated_at__lt=cutoff, chatmessage__isnull=True)
+    raise ValueError(f'No retention policy is known for table "{table}"')
+
+
+def iter_batches(queryset, batch_size):
+    """
+    Yield lists of expired rows as dictionaries, batch_size at a time.
+
+    Rows are read in primary key order with keyset pagination, so
+    every query stays cheap no matter how far through the table we are,
+    and rows the caller decided not to delete are not read again.
+
+    Args:
+        queryset (QuerySet): Rows to read
+        batch_size (int): Number of rows per batch
+    """
+    last_pk = None
+    while True:
+        batch_queryset = queryset.order_by('pk')
+        if last_pk is not None:
+            batch_queryset = batch_queryset.filter(pk__gt=last_pk)
+        batch = list(batch_queryset.values()[:batch_size])
+        if not batch:
+            return
+        last_pk = batch[-1]['id']
+        yield batch
+
+
+def open_archive(archive_dir, table):
+    """
+    Open a new gzip-compressed JSONL archive file for a table.
+
+    Returns:
+        tuple: (path, file object)
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+    path = os.path.join(archive_dir, f'{table}-{stamp}.jsonl.gz')
+    return path, gzip.open(path, 'at', encoding='utf-8')
+
+
+def compact_table(table, policy, options, dry_run=False, log=None):
+    """
+    Archive and delete the expired rows of one table.
+
+    Args:
+        table (str): Table name from the retention settings
+        policy (dict): The table's retention policy
+        options (dict): Retention settings
+        dry_run (bool): Only count the rows that would be removed
+        log (callable): Optional function used to report progress
+
+    Returns:
+        int: Number of rows archived (or that would be, on a dry run)
+    """
+    log = log or (lambda message: None)
+    keep_days = policy.get('KEEP_DAYS')
+    if keep_days is None:
+        log(f'{table}: kept forever')
+        return 0
+
+    cutoff = get_cutoff(keep_days)
+    queryset = get_expired_queryset(table, cutoff)
+
+    if table == 'chatmessage' and not dry_run:
+        # Roll messages up and mark their days final before any of them
+        # are deleted, so a later run never recounts a half-deleted day
+        oldest = queryset.aggregate(oldest=Min('timestamp'))['oldest']
+        if oldest is not None:
+            rollup_daily_stats(timezone.localdate(oldest), cutoff.date(), finalize=True)
+
+    batch_size = policy.get('BATCH_SIZE', options['BATCH_SIZE'])
+    archive = policy.get('ARCHIVE', True) and not dry_run
+    path, archive_file = open_archive(options['ARCHIVE_DIR'], table) if archive else (None, None)
+
+    total = 0
+    try:
+        for batch in iter_batches(queryset, batch_size):
+            if dry_run:
+                total += len(batch)
+                continue
+
+            with transaction.atomic():
+                # Check expiry again, e.g. a session may have had a message
+                # saved since the batch was read and must not be deleted
+                expired = queryset.filter(pk__in=[row['id'] for row in batch])
+                expired_ids = set(expired.values_list('pk', flat=True))
+                rows = [row for row in batch if row['id'] in expired_ids]
+                if not rows:
+                    continue
+
+                if archive_file:
+                    for row in rows:
+                        archive_file.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+                    # Make sure the rows are on disk before they leave the database
+                    archive_file.flush()
+                    os.fsync(archive_file.fileno())
+
+                queryset.filter(pk__in=expired_ids).delete()
+                total += len(rows)
+
+            time.sleep(options['BATCH_PAUSE'])
+    finally:
+        if archive_file:
+            archive_file.close()
+            if not total:
+                os.remove(path)
+
+    action = 'would be removed' if dry_run else 'removed'
+    log(f'{table}: {total} row(s) older than {cutoff.date()} {action}'
+        + (f', archived to {path}' if archive and total else ''))
+    return total
+
+
+def compact_history(tables=None, dry_run=False, log=None):
+    """
+    Apply the retention policy to each configured table.
+
+    Messages are compacted before sessions, so sessions that have
+    just lost their last message can expire in the same run.
+
+    Args:
+        tables (list): Table names to compact, defaults to all of them
+        dry_run (bool): Only count the rows that would be removed
+        log (callable): Optional function used to report progress
+
+    Returns:
+        dict: Number of rows removed for each table
+    """
+    options = get_retention_settings()
+    order = ['chatmessage', 'chatsession']
+    selected = tables or order
+
+    return {
+        table: compact_table(table, options['TABLES'][table], options, dry_run=dry_run, log=log)
+        for table in order
+        if table in selected and table in options['TABLES']
+    }
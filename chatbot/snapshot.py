@@ -0,0 +1,269 @@
+"""
+Read-only response snapshot for the chatbot's serving path.
+
+A snapshot is a single binary file that holds every known prompt and
+its responses, exported from the chatbot's storage. Strings are stored
+once (interned) and referenced by integer id, and prompts point into a
+flat array of response ids through an offset array, like this:
+
+    header        magic, byte order, number of strings, prompts, responses
+    string_offs   uint32[strings + 1]  start of each string in the blob
+    prompt_keys   uint32[prompts]      string id of each normalized prompt, sorted
+    response_offs uint32[prompts + 1]  start of each prompt's responses
+    responses     uint32[responses]    string id of each response text
+    blob          UTF-8 bytes of all strings
+
+The file is memory-mapped and searched in place, so every worker on the
+same machine shares one physical copy and lookups never touch SQL.
+"""
+
+import logging
+import mmap
+import os
+import struct
+from array import array
+
+from .logic import normalize_text
+
+MAGIC = b'CBSNAP01'
+
+# Written in native byte order, this tells a reader whether it can use the file as is
+BYTE_ORDER_MARK = 0x01020304
+
+HEADER = struct.Struct('=8sIIII')
+
+logger = logging.getLogger(__name__)
+
+
+def iter_prompt_responses(storage, batch_size=1000):
+    """
+    Yield (prompt, response) text pairs from storage in id order.
+
+    Bot responses are skipped, the same as BestMatch does.
+    """
+    Statement = storage.get_model('statement')
+    last_id = 0
+
+    while True:
+        session = storage.Session()
+        try:
+            rows = (
+                session.query(Statement.id, Statement.in_response_to, Statement.text)
+                .filter(Statement.id > last_id)
+                .filter(Statement.in_response_to.isnot(None))
+                .filter(~Statement.persona.startswith('bot:'))
+                .order_by(Statement.id)
+                .limit(batch_size)
+                .all()
+            )
+        finally:
+            session.close()
+
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        for _, prompt, text in rows:
+            yield prompt, text
+
+
+def build_snapshot(pairs, path):
+    """
+    Write a snapshot file from (prompt, response) pairs.
+
+    The file is written next to the target and then renamed over it,
+    so workers that still have the old snapshot mapped are unaffected.
+
+    Args:
+        pairs (iterable): (prompt, response) text pairs
+        path (str): Where to write the snapshot
+
+    Returns:
+        int: Number of distinct prompts written
+    """
+    string_ids = {}
+    strings = []
+
+    def intern(text):
+        string_id = string_ids.get(text)
+        if string_id is None:
+            string_id = string_ids[text] = len(strings)
+            strings.append(text)
+        return string_id
+
+    prompt_responses = {}
+    for prompt, response in pairs:
+        key = normalize_text(prompt)
+        if not key:
+            continue
+        responses = prompt_responses.setdefault(intern(key), [])
+        response_id = intern(response)
+        if response_id not in responses:
+            responses.append(response_id)
+
+    encoded = [text.encode('utf-8') for text in strings]
+
+    string_offsets = array('I', [0])
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+
+    # Sort prompts by their UTF-8 bytes so readers can binary search them
+    prompt_keys = array('I', sorted(prompt_responses, key=lambda string_id: encoded[string_id]))
+    response_offsets = array('I', [0])
+    responses = array('I')
+    for key_id in prompt_keys:
+        responses.extend(prompt_responses[key_id])
+        response_offsets.append(len(responses))
+
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'wb') as snapshot_file:
+        snapshot_file.write(HEADER.pack(
+            MAGIC, BYTE_ORDER_MARK, len(strings), len(prompt_keys), len(responses)
+        ))
+        for section in (string_offsets, prompt_keys, response_offsets, responses):
+            section.tofile(snapshot_file)
+        for data in encoded:
+            snapshot_file.write(data)
+    os.replace(temporary_path, path)
+
+    return len(prompt_keys)
+
+
+class ResponseSnapshot:
+    """
+    A memory-mapped, read-only view of a snapshot file.
+
+    Args:
+        path (str): Path of the snapshot file
+
+    Raises:
+        ValueError: If the file is not a snapshot this machine can read
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as snapshot_file:
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, byte_order, string_count, prompt_count, response_count = \
+                HEADER.unpack_from(self._mmap, 0)
+        except struct.error:
+            self._mmap.close()
+            raise ValueError(f'{path} is too short to be a response snapshot')
+        if magic != MAGIC or byte_order != BYTE_ORDER_MARK:
+            self._mmap.close()
+            raise ValueError(f'{path} is not a response snapshot for this machine, rebuild it')
+
+        # The four uint32 sections must fit, and the blob must end where
+        # the last string offset says, or lookups would read past the end
+        blob_start = HEADER.size + 4 * (string_count + 1 + 2 * prompt_count + 1 + response_count)
+        if len(self._mmap) < blob_start:
+            self._mmap.close()
+            raise ValueError(f'{path} is truncated, rebuild it')
+        blob_size = struct.unpack_from('=I', self._mmap, HEADER.size + 4 * string_count)[0]
+        if len(self._mmap) != blob_start + blob_size:
+            self._mmap.close()
+            raise ValueError(f'{path} is truncated, rebuild it')
+
+        view = memoryview(self._mmap)
+        position = HEADER.size
+
+        def section(count):
+            nonlocal position
+            start = position
+            position += count * 4
+            return view[start:position].cast('I')
+
+        self.string_offsets = section(string_count + 1)
+        self.prompt_keys = section(prompt_count)
+        self.response_offsets = section(prompt_count + 1)
+        self.responses = section(response_count)
+        self.blob_start = position
+        self._view = view
+
+    def __len__(self):
+        return len(self.prompt_keys)
+
+    def _get_bytes(self, string_id):
+        start = self.blob_start + self.string_offsets[string_id]
+        end = self.blob_start + self.string_offsets[string_id + 1]
+        return self._mmap[start:end]
+
+    def get_string(self, string_id):
+        """
+        Return the text of an interned string.
+        """
+        return self._get_bytes(string_id).decode('utf-8')
+
+    def find_prompt(self, text):
+        """
+        Return the index of the prompt matching text, or None.
+
+        Args:
+            text (str): The user's message, normalized before searching
+        """
+        key = normalize_text(text).encode('utf-8')
+        low, high = 0, len(self.prompt_keys)
+        while low < high:
+            middle = (low + high) // 2
+            candidate = self._get_bytes(self.prompt_keys[middle])
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def get_responses(self, text):
+        """
+        Return every known response to a message.
+
+        Args:
+            text (str): The user's message
+
+        Returns:
+            list: Response texts in the order they were learned
+        """
+        index = self.find_prompt(text)
+        if index is None:
+            return []
+        start, end = self.response_offsets[index], self.response_offsets[index + 1]
+        return [self.get_string(string_id) for string_id in self.responses[start:end]]
+
+    def lookup(self, text):
+        """
+        Return the first known response to a message, or None.
+        """
+        index = self.find_prompt(text)
+        if index is None:
+            return None
+        start, end = self.response_offsets[index], self.response_offsets[index + 1]
+        return self.get_string(self.responses[start]) if end > start else None
+
+    def close(self):
+        """
+        Release the memory map.
+        """
+        for name in ('string_offsets', 'prompt_keys', 'response_offsets', 'responses', '_view'):
+            getattr(self, name).release()
+        self._mmap.close()
+
+
+def load_snapshot(path):
+    """
+    Open a snapshot file if it exists and is valid.
+
+    Args:
+        path (str): Path of the snapshot file, or None
+
+    Returns:
+        ResponseSnapshot: The snapshot, or None if it is not available
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return ResponseSnapshot(path)
+    except (OSError, ValueError) as error:
+        logger.warning('Response snapshot not loaded: %s', error)
+        return None
@@ -9,6 +9,21 @@
 let messageCount = 0;
 let isTyping = false;
 
+// Request pipeline settings
+const REQUEST_TIMEOUT_MS = 15000;   // Give up on a single attempt after this long
+const MAX_RETRIES = 5;              // Retries after the first attempt
+const BACKOFF_BASE_MS = 500;        // First retry waits up to this long
+const BACKOFF_MAX_MS = 15000;       // Longest wait between retries
+const RETRY_AFTER_MAX_MS = 60000;   // Longest Retry-After we are willing to honor
+const DEBOUNCE_MS = 300;            // Ignore the same message sent twice within this time
+const RETRYABLE_STATUSES = [408, 409, 425, 429, 500, 502, 503, 504];
+
+// Request pipeline state
+let activeRequest = null;           // Message currently waiting for a reply
+let offlineQueue = [];              // Messages typed while offline
+let lastFailedRequest = null;       // Message that can be retried
+let lastSubmit = { text: '', time: 0 };
+
 /**
  * Initialize the chat interface when the page loads
  */
@@ -42,6 +57,10 @@ function initializeChat() {
     // Set up auto-scroll
     setupAutoScroll();
 
+    // Send queued messages when the connection comes back
+    window.addEventListener('online', flushOfflineQueue);
+    window.addEventListener('offline', handleConnectionError);
+
     console.log('Chat initialized successfully');
 }
 
@@ -80,28 +99,56 @@ function sendMessage() {
         return;
     }
 
-    if (isTyping) {
-        console.log('Bot is typing, please wait...');
+    // Ignore a double submit (Enter plus click) of the same message
+    const now = Date.now();
+    if (message === lastSubmit.text && now - lastSubmit.time < DEBOUNCE_MS) {
         return;
     }
-
-    // Disable controls
-    setControlsEnabled(false);
+    lastSubmit = { text: message, time: now };
 
     // Show user message
     addMessage('User', message, 'user-message');
 
     // Clear input
     userInput.value = '';
+    userInput.focus();
+
+    dispatchMessage({
+        message: message,
+        idempotencyKey: createIdempotencyKey()
+    });
+}
+
+/**
+ * Send a message request and show the reply.
+ *
+ * A newer message cancels the one still waiting for a reply. Messages
+ * sent while offline are queued until the connection comes back.
+ */
+function dispatchMessage(request) {
+    if (!navigator.onLine) {
+        queueOfflineMessage(request);
+        return Promise.resolve();
+    }
+
+    // Cancel the request this one supersedes
+    if (activeRequest) {
+        activeRequest.controller.abort();
+        console.log(`Cancelled superseded message: ${activeRequest.message}`);
+    }
+
+    const controller = new AbortController();
+    activeRequest = { ...request, controller: controller };
 
     // Show typing indicator
     showTypingIndicator();
 
     // Send request to server
-    sendMessageToServer(message)
+    return sendMessageToServer(request.message, {
+        idempotencyKey: request.idempotencyKey,
+        signal: controller.signal
+    })
         .then(response => {
-            hideTypingIndicator();
-
             if (response.success && response.bot_response) {
                 addMessage('Bot', response.bot_response, 'bot-message');
             } else {
@@ -109,39 +156,167 @@ function sendMessage() {
             }
         })
         .catch(error => {
+            if (controller.signal.aborted) {
+                return;
+            }
+            if (error.offline) {
+                queueOfflineMessage(request);
+                return;
+            }
             console.error('Error sending message:', error);
-            hideTypingIndicator();
-            addMessage('Bot', 'Sorry, I had trouble connecting. Please check your internet and try again.', 'bot-message error');
+            lastFailedRequest = request;
+            const errorMessage = addMessage('Bot', 'Sorry, I had trouble connecting. Please check your internet and try again.', 'bot-message error');
+            addRetryButton(errorMessage);
         })
         .finally(() => {
-            setControlsEnabled(true);
-            userInput.focus();
+            if (activeRequest && activeRequest.controller === controller) {
+                activeRequest = null;
+                hideTypingIndicator();
+            }
         });
 }
 
 /**
- * Send message to server and return promise
+ * Send message to server and return promise.
+ *
+ * Every attempt carries the same Idempotency-Key, so the server answers
+ * a retried message from its stored reply instead of computing it again.
+ * Failed attempts are retried with jittered exponential backoff.
  */
-async function sendMessageToServer(message) {
-    const url = `/get-response/?message=${encodeURIComponent(message)}`;
-
-    try {
-        const response = await fetch(url, {
-            method: 'GET',
-            headers: {
-                'Content-Type': 'application/json',
+async function sendMessageToServer(message, options = {}) {
+    const idempotencyKey = options.idempotencyKey || createIdempotencyKey();
+    const signal = options.signal;
+
+    for (let attempt = 0; ; attempt++) {
+        // Each attempt has its own timeout, and is also cancelled with the message
+        const attemptController = new AbortController();
+        const timer = setTimeout(() => attemptController.abort(), REQUEST_TIMEOUT_MS);
+        const cancelAttempt = () => attemptController.abort();
+        if (signal) {
+            signal.addEventListener('abort', cancelAttempt);
+        }
+
+        let response;
+        try {
+            response = await fetch('/get-response/', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Idempotency-Key': idempotencyKey
+                },
+                body: JSON.stringify({ message: message }),
+                credentials: 'same-origin',
+                signal: attemptController.signal
+            });
+        } catch (error) {
+            if (signal && signal.aborted) {
+                throw error;
             }
-        });
+            if (!navigator.onLine) {
+                error.offline = true;
+                throw error;
+            }
+            if (attempt >= MAX_RETRIES) {
+                console.error('Network error:', error);
+                throw error;
+            }
+            await sleep(getBackoffDelay(attempt), signal);
+            continue;
+        } finally {
+            clearTimeout(timer);
+            if (signal) {
+                signal.removeEventListener('abort', cancelAttempt);
+            }
+        }
+
+        if (response.ok) {
+            return response.json();
+        }
 
-        if (!response.ok) {
+        if (!RETRYABLE_STATUSES.includes(response.status) || attempt >= MAX_RETRIES) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
-        const data = await response.json();
-        return data;
-    } catch (error) {
-        console.error('Network error:', error);
-        throw error;
+        console.log(`Server returned ${response.status}, retrying (attempt ${attempt + 1} of ${MAX_RETRIES})`);
+        await sleep(getBackoffDelay(attempt, response.headers.get('Retry-After')), signal);
+    }
+}
+
+/**
+ * Return how long to wait before the next retry, in milliseconds.
+ *
+ * Uses "full jitter": a random delay up to an exponentially growing
+ * limit, so clients that failed together do not retry together.
+ * A Retry-After header from the server is the minimum wait.
+ */
+function getBackoffDelay(attempt, retryAfterHeader) {
+    const limit = Math.min(BACKOFF_MAX_MS, BACKOFF_BASE_MS * Math.pow(2, attempt));
+    const jittered = Math.random() * limit;
+    return Math.max(jittered, parseRetryAfter(retryAfterHeader));
+}
+
+/**
+ * Parse a Retry-After header (seconds or an HTTP date) into milliseconds
+ */
+function parseRetryAfter(value) {
+    if (!value) {
+        return 0;
+    }
+
+    let delay = Number(value) * 1000;
+    if (Number.isNaN(delay)) {
+        delay = Date.parse(value) - Date.now();
+    }
+
+    if (Number.isNaN(delay) || delay < 0) {
+        return 0;
+    }
+    return Math.min(delay, RETRY_AFTER_MAX_MS);
+}
+
+/**
+ * Wait for a number of milliseconds, stopping early if cancelled
+ */
+function sleep(ms, signal) {
+    return new Promise((resolve, reject) => {
+        if (signal && signal.aborted) {
+            reject(new DOMException('Aborted', 'AbortError'));
+            return;
+        }
+        const timer = setTimeout(resolve, ms);
+        if (signal) {
+            signal.addEventListener('abort', () => {
+                clearTimeout(timer);
+                reject(new DOMException('Aborted', 'AbortError'));
+            }, { once: true });
+        }
+    });
+}
+
+/**
+ * Create a unique key that identifies one message across retries
+ */
+function createIdempotencyKey() {
+    if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+        return window.crypto.randomUUID();
+    }
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+}
+
+/**
+ * Keep a message until the browser is back online
+ */
+function queueOfflineMessage(request) {
+    offlineQueue.push(request);
+    addMessage('System', 'You are offline. Your message will be sent when the connection is back.', 'bot-message error');
+}
+
+/**
+ * Send the messages queued while offline, oldest first
+ */
+async function flushOfflineQueue() {
+    while (offlineQueue.length > 0 && navigator.onLine) {
+        await dispatchMessage(offlineQueue.shift());
     }
 }
 
@@ -180,6 +355,25 @@ function addMessage(sender, message, cssClass) {
 
     // Log message for debugging
     console.log(`${sender}: ${message}`);
+
+    return messageDiv;
+}
+
+/**
+ * Add a retry button to a failed message
+ */
+function addRetryButton(messageElement) {
+    if (!messageElement) return;
+
+    const button = document.createElement('button');
+    button.type = 'button';
+    button.className = 'retry-button';
+    button.textContent = 'Retry';
+    button.addEventListener('click', () => {
+        button.remove();
+        retryLastMessage();
+    });
+    messageElement.querySelector('.message-content').appendChild(button);
 }
 
 /**
@@ -360,8 +554,15 @@ function handleConnectionError() {
  * Retry sending message
  */
 function retryLastMessage() {
-    // Implementation for retrying last message
-    console.log('Retry functionality not implemented yet');
+    if (!lastFailedRequest) {
+        console.log('No failed message to retry');
+        return;
+    }
+
+    // The same idempotency key lets the server reuse a reply it already made
+    const request = lastFailedRequest;
+    lastFailedRequest = null;
+    dispatchMessage(request);
 }
 
 /**
@@ -369,6 +570,7 @@ function retryLastMessage() {
  */
 window.ChatBot = {
     sendMessage,
+    retryLastMessage,
     clearChat,
     addMessage,
     setControlsEnabled,
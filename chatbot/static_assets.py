@@ -0,0 +1,153 @@
+"""
+Fingerprinted, precompressed static files for the chatbot.
+
+collectstatic gives every file a content hash in its name and then
+writes gzip (and brotli, if installed) copies next to it. The serve
+view picks the best copy for the browser and marks hashed files as
+cacheable forever, since a changed file always gets a new name.
+"""
+
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# File types that are worth compressing
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.html', '.json', '.txt', '.xml')
+
+# Files smaller than this are sent as they are
+MIN_COMPRESS_SIZE = 256
+
+# Matches the hash ManifestStaticFilesStorage adds, e.g. chat.3f2a1b4c5d6e.js
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+
+FAR_FUTURE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+SHORT_CACHE_CONTROL = 'public, max-age=3600'
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage that also writes .gz and .br copies of each file.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        """
+        Hash the files as usual, then compress every hashed file.
+        """
+        hashed_names = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.append(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+
+        for hashed_name in hashed_names:
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        """
+        Write compressed copies of a file if they are smaller than it.
+
+        Args:
+            name (str): Name of the file in storage
+        """
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            content = source.read()
+
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+
+        for suffix, compressed in variants:
+            # Only keep a copy that saves at least 5%
+            if len(compressed) < len(content) * 0.95:
+                with open(path + suffix, 'wb') as target:
+                    target.write(compressed)
+
+
+def get_accepted_encodings(request):
+    """
+    Return the content codings the browser accepts.
+
+    Args:
+        request (HttpRequest): The HTTP request object
+
+    Returns:
+        set: Encodings such as 'br' and 'gzip'
+    """
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        encoding, _, params = part.strip().partition(';')
+        quality = 1.0
+        key, _, value = params.strip().partition('=')
+        if key.strip() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if encoding and quality > 0:
+            accepted.add(encoding.strip().lower())
+    return accepted
+
+
+def serve(request, path):
+    """
+    Serve a collected static file, precompressed when possible.
+
+    Args:
+        request (HttpRequest): The HTTP request object
+        path (str): Path of the file below STATIC_ROOT
+
+    Returns:
+        FileResponse: The file with caching headers
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except (SuspiciousFileOperation, ValueError):
+        raise Http404('Invalid static file path')
+
+    if not os.path.isfile(full_path):
+        raise Http404('Static file not found')
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type == 'application/javascript':
+        content_type += '; charset=utf-8'
+
+    accepted = get_accepted_encodings(request)
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if candidate in accepted and os.path.isfile(full_path + suffix):
+            encoding = candidate
+            full_path += suffix
+            break
+
+    response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+
+    if HASHED_NAME_RE.search(path):
+        response['Cache-Control'] = FAR_FUTURE_CACHE_CONTROL
+    else:
+        response['Cache-Control'] = SHORT_CACHE_CONTROL
+    return response
@@ -5,14 +5,51 @@ This module contains unit tests for the chatbot functionality,
 including views, models, and bot responses.
 """
 
-from django.test import TestCase, Client
+from chatterbot import ChatBot
+from chatterbot.conversation import Statement
+from chatterbot.logic import BestMatch
+from chatterbot.tagging import LowercaseTagger
+from chatterbot.trainers import ListTrainer
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import TestCase, Client, RequestFactory, override_settings
 from django.urls import reverse
 from django.utils import timezone
+from unittest import mock
+import datetime
+import gzip
 import json
-from .models import ChatSession, ChatMessage
+import os
+import tempfile
+import tracemalloc
+from .models import ChatSession, ChatMessage, DailyChatStats
+from .admin import estimate_row_count
+from .analytics import rollup_daily_stats
+from .retention import compact_history, iter_batches
+from .corpus import expand_records, export_corpus, import_corpus, read_records
+from .profiling import MemoryProfiler, component_for_filename, growth_per_request
+from .snapshot import ResponseSnapshot, build_snapshot, load_snapshot
+from .static_assets import CompressedManifestStaticFilesStorage, get_accepted_encodings, serve
 from .bot import get_bot_response
+from .logic import BKTree, TypoTolerantMatch, edit_distance
+from .context import ConversationContextCache, conversation_cache
 
+# Pages link to hashed static file names, so the tests need a manifest
+static_root_settings = override_settings(STATIC_ROOT=tempfile.mkdtemp())
 
+
+def setUpModule():
+    """Collect static files into a temporary STATIC_ROOT."""
+    static_root_settings.enable()
+    call_command('collectstatic', interactive=False, verbosity=0)
+
+
+def tearDownModule():
+    static_root_settings.disable()
+
+
+@mock.patch.object(conversation_cache, 'async_flush', False)
 class ChatbotViewsTestCase(TestCase):
     """
     Test cases for chatbot views.
@@ -22,12 +59,24 @@ class ChatbotViewsTestCase(TestCase):
         """Set up test client and data."""
         self.client = Client()
 
+    def tearDown(self):
+        """Drop queued chat turns so they are not saved after the test database is gone."""
+        conversation_cache.clear()
+
     def test_home_view(self):
         """Test that home view renders correctly."""
         response = self.client.get(reverse('chatbot:home'))
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Chat with My Bot')
 
+    def test_home_view_conditional_get(self):
+        """Test that a repeated request with the ETag gets a 304."""
+        response = self.client.get(reverse('chatbot:home'))
+        self.assertIn('ETag', response)
+
+        response = self.client.get(reverse('chatbot:home'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
     def test_get_response_view_with_message(self):
         """Test get_response view with valid message."""
         response = self.client.get(
@@ -66,6 +115,94 @@ class ChatbotViewsTestCase(TestCase):
         self.assertIn('user_message', data)
         self.assertIn('bot_response', data)
 
+    def test_get_response_idempotency_key_replays_reply(self):
+        """Test that a retried message is answered from the stored reply."""
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'test-key-0001'}
+        body = json.dumps({'message': 'Hello'})
+
+        with mock.patch('chatbot.views.get_bot_response', return_value='Hi there!') as bot:
+            first = self.client.post(reverse('chatbot:get_response'), body, content_type='application/json', **headers)
+            second = self.client.post(reverse('chatbot:get_response'), body, content_type='application/json', **headers)
+
+        self.assertEqual(bot.call_count, 1)
+        self.assertEqual(json.loads(first.content), json.loads(second.content))
+
+    def test_get_response_idempotency_key_is_scoped_to_session(self):
+        """Test that another chat session cannot replay a stored reply."""
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'test-key-0004'}
+
+        with mock.patch('chatbot.views.get_bot_response', return_value='Hi there!') as bot:
+            self.client.get(reverse('chatbot:get_response'), {'message': 'Hello'}, **headers)
+            other_client = Client()
+            other_client.cookies['chat_session_id'] = 'b' * 32
+            response = other_client.get(reverse('chatbot:get_response'), {'message': 'Hello'}, **headers)
+
+        self.assertEqual(bot.call_count, 1)
+        self.assertEqual(response.status_code, 422)
+
+    def test_get_response_failure_is_not_replayed(self):
+        """Test that a failed reply is a 503 and a retry asks the bot again in the same session."""
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'test-key-0005'}
+
+        with mock.patch('chatbot.views.get_bot_response', side_effect=[RuntimeError, 'Hi there!']) as bot:
+            failed = self.client.get(reverse('chatbot:get_response'), {'message': 'Hello'}, **headers)
+            retried = self.client.get(reverse('chatbot:get_response'), {'message': 'Hello'}, **headers)
+
+        self.assertEqual(failed.status_code, 503)
+        self.assertIn('chat_session_id', failed.cookies)
+        self.assertEqual(retried.status_code, 200)
+        self.assertEqual(json.loads(retried.content)['bot_response'], 'Hi there!')
+        self.assertEqual(bot.call_count, 2)
+        self.assertEqual(bot.call_args_list[0].kwargs['session_id'], bot.call_args_list[1].kwargs['session_id'])
+
+    def test_get_response_retry_without_cookie_after_conflict(self):
+        """Test that a first-time visitor's retries join the attempt in progress."""
+        owner_session_id = 'c' * 32
+        cache.add('chatbot:idempotency:test-key-0006:lock', owner_session_id)
+
+        with mock.patch('chatbot.views.get_bot_response') as bot:
+            conflict = self.client.get(
+                reverse('chatbot:get_response'), {'message': 'Hello'}, HTTP_IDEMPOTENCY_KEY='test-key-0006'
+            )
+            self.assertEqual(conflict.status_code, 409)
+            self.assertEqual(conflict.cookies['chat_session_id'].value, owner_session_id)
+
+            # The first attempt finishes and stores its reply
+            cache.set('chatbot:idempotency:test-key-0006', {
+                'response': {'user_message': 'Hello', 'bot_response': 'Hi', 'success': True},
+                'session_id': owner_session_id,
+            })
+            cache.delete('chatbot:idempotency:test-key-0006:lock')
+
+            retried = Client().get(
+                reverse('chatbot:get_response'), {'message': 'Hello'}, HTTP_IDEMPOTENCY_KEY='test-key-0006'
+            )
+
+        bot.assert_not_called()
+        self.assertEqual(json.loads(retried.content)['bot_response'], 'Hi')
+        self.assertEqual(retried.cookies['chat_session_id'].value, owner_session_id)
+
+    def test_get_response_idempotency_key_conflicts(self):
+        """Test in-progress and mismatched idempotency keys."""
+        session_id = 'a' * 32
+        self.client.cookies['chat_session_id'] = session_id
+
+        cache.add('chatbot:idempotency:test-key-0002:lock', 'd' * 32)
+        response = self.client.get(
+            reverse('chatbot:get_response'), {'message': 'Hello'}, HTTP_IDEMPOTENCY_KEY='test-key-0002'
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+
+        cache.set('chatbot:idempotency:test-key-0003', {
+            'response': {'user_message': 'Hello', 'bot_response': 'Hi'},
+            'session_id': session_id,
+        })
+        response = self.client.get(
+            reverse('chatbot:get_response'), {'message': 'Bye'}, HTTP_IDEMPOTENCY_KEY='test-key-0003'
+        )
+        self.assertEqual(response.status_code, 422)
+
     def test_about_view(self):
         """Test about view renders correctly."""
         response = self.client.get(reverse('chatbot:about'))
@@ -143,12 +280,478 @@ class ChatbotLogicTestCase(TestCase):
             self.assertIsInstance(response, str)
             self.assertTrue(len(response) > 0)
 
+    def test_get_bot_response_with_typo(self):
+        """Test that a misspelled question is answered from the BK-tree."""
+        with mock.patch.object(BestMatch, 'process') as best_match:
+            response = get_bot_response('What is Djnago?')
+        best_match.assert_not_called()
+        self.assertIn('Django', response)
+
+
+class ChatbotTypoIndexTestCase(TestCase):
+    """
+    Test cases for the BK-tree used by the typo-tolerant matcher.
+    """
+
+    def setUp(self):
+        """Build a small tree of known prompts."""
+        self.tree = BKTree()
+        for text in ['Hello', 'How are you?', 'What is Django?', 'Tell me a joke']:
+            self.tree.add(text)
+
+    def test_edit_distance(self):
+        """Test the Levenshtein distance helper."""
+        self.assertEqual(edit_distance('kitten', 'sitting'), 3)
+        self.assertEqual(edit_distance('', 'abc'), 3)
+        self.assertEqual(edit_distance('same', 'same'), 0)
+
+    def test_search_finds_misspelled_prompt(self):
+        """Test that a search tolerates a couple of typos."""
+        results = self.tree.search('how ar yuo', 3)
+        self.assertEqual(results[0][1], 'How are you?')
+
+    def test_search_ignores_case_and_punctuation(self):
+        """Test that normalization makes exact matches distance zero."""
+        results = self.tree.search('HELLO!!', 0)
+        self.assertEqual(results, [(0, 'Hello')])
+
+    def test_search_respects_distance_bound(self):
+        """Test that nothing outside the bound is returned."""
+        self.assertEqual(self.tree.search('completely different', 2), [])
+
+    def test_index_picks_up_learned_prompts(self):
+        """Test that prompts learned after loading are matched and persisted."""
+        directory = tempfile.mkdtemp()
+        typo_bot = ChatBot(
+            'TypoTestBot',
+            database_uri='sqlite:///' + os.path.join(directory, 'typo.sqlite3'),
+            tagger=LowercaseTagger,
+            logic_adapters=[{
+                'import_path': 'chatbot.logic.TypoTolerantMatch',
+                'index_path': os.path.join(directory, 'typo.pickle'),
+                'index_refresh_interval': 0
+            }]
+        )
+        adapter = typo_bot.logic_adapters[0]
+        ListTrainer(typo_bot, show_training_progress=False).train(['What is Django?', 'A framework.'])
+        self.assertEqual(adapter.process(Statement('What is Djnago?')).text, 'A framework.')
+
+        ListTrainer(typo_bot, show_training_progress=False).train(['Where is the station?', 'Down the road.'])
+        self.assertEqual(adapter.process(Statement('Where is teh station?')).text, 'Down the road.')
+
+        with mock.patch.object(BestMatch, 'process', return_value=Statement('Fallback')) as best_match:
+            self.assertEqual(adapter.process(Statement('Something else entirely')).text, 'Fallback')
+        best_match.assert_called_once()
+
+        reloaded = TypoTolerantMatch(typo_bot, index_path=adapter.index_path)
+        self.assertEqual(len(reloaded.get_index()), 2)
+        self.assertEqual(reloaded.watermark, adapter.watermark)
+
+
+class ChatbotContextCacheTestCase(TestCase):
+    """
+    Test cases for the per-session conversation context cache.
+    """
+
+    def setUp(self):
+        """Create a small cache that saves synchronously."""
+        self.cache = ConversationContextCache(max_turns=2, max_sessions=2, async_flush=False)
+
+    def test_turns_are_bounded_per_session(self):
+        """Test that only the most recent turns are kept."""
+        for number in range(3):
+            self.cache.record('session_a', f'message {number}', f'reply {number}')
+        self.assertEqual(
+            self.cache.get_context('session_a'),
+            [('message 1', 'reply 1'), ('message 2', 'reply 2')]
+        )
+        self.assertEqual(self.cache.get_last_response('session_a'), 'reply 2')
+
+    def test_least_recent_session_is_evicted(self):
+        """Test that the total number of sessions is bounded."""
+        self.cache.record('session_a', 'Hello', 'Hi')
+        self.cache.record('session_b', 'Hello', 'Hi')
+        self.cache.get_context('session_a')
+        self.cache.record('session_c', 'Hello', 'Hi')
+        self.assertEqual(self.cache.get_context('session_b'), [])
+        self.assertEqual(len(self.cache.get_context('session_a')), 1)
+
+    def test_flush_saves_messages(self):
+        """Test that queued turns are written to ChatMessage."""
+        self.cache.record('session_a', 'Hello', 'Hi')
+        self.cache.record('session_a', 'How are you?', 'Fine')
+        self.assertEqual(self.cache.flush(), 2)
+        self.assertEqual(self.cache.flush(), 0)
+        session = ChatSession.objects.get(session_id='session_a')
+        self.assertEqual(ChatMessage.objects.filter(session=session).count(), 2)
+
+    def test_failed_flush_keeps_newest_turns(self):
+        """Test that a requeued batch drops the oldest turns when the queue is full."""
+        cache = ConversationContextCache(max_pending=3, async_flush=False)
+        for number in range(3):
+            cache.record('session_a', f'message {number}', 'reply')
+
+        def fail_after_new_turn(*args, **kwargs):
+            cache.record('session_a', 'message 3', 'reply')
+            raise RuntimeError('database unavailable')
+
+        with mock.patch.object(ChatMessage.objects, 'bulk_create', side_effect=fail_after_new_turn):
+            with self.assertLogs('chatbot.context', 'WARNING') as logs:
+                self.assertEqual(cache.flush(), 0)
+
+        self.assertIn('dropping the 1 oldest turns', '\n'.join(logs.output))
+
+        self.assertEqual(
+            [turn[1] for turn in cache._pending],
+            ['message 1', 'message 2', 'message 3']
+        )
+
+
+class ChatbotAdminTestCase(TestCase):
+    """
+    Test cases for the chat history admin and analytics.
+    """
+
+    def setUp(self):
+        """Log in as an admin user and create some messages."""
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client = Client()
+        self.client.login(username='admin', password='password')
+
+        self.session = ChatSession.objects.create(session_id='admin_session')
+        for _ in range(3):
+            ChatMessage.objects.create(
+                session=self.session,
+                user_message='x' * 80,
+                bot_response='Short reply'
+            )
+
+    def test_changelist_shows_truncated_previews(self):
+        """Test that long messages are cut to a preview."""
+        response = self.client.get(reverse('admin:chatbot_chatmessage_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'x' * 50 + '...')
+        self.assertContains(response, 'admin_session')
 
+    def test_changelist_filters_by_session(self):
+        """Test filtering messages by session primary key."""
+        ChatMessage.objects.create(user_message='Hello', bot_response='Hi')
+        response = self.client.get(
+            reverse('admin:chatbot_chatmessage_changelist'),
+            {'session': self.session.pk}
+        )
+        self.assertEqual(len(response.context['cl'].result_list), 3)
+
+    def test_row_estimate_ignores_deleted_old_rows(self):
+        """Test that deleting the oldest rows lowers the SQLite estimate."""
+        oldest = ChatMessage.objects.order_by('pk').first()
+        oldest.delete()
+        self.assertEqual(estimate_row_count(ChatMessage), 2)
+
+    def test_rollup_and_analytics_view(self):
+        """Test that daily stats are precomputed and shown."""
+        today = timezone.localdate()
+        self.assertEqual(rollup_daily_stats(today, today + datetime.timedelta(days=1)), 1)
+        stats = DailyChatStats.objects.get(date=today)
+        self.assertEqual(stats.message_count, 3)
+        self.assertEqual(stats.session_count, 1)
+
+        response = self.client.get(reverse('admin:chatbot_chatmessage_analytics'))
+        self.assertContains(response, '3 messages')
+
+
+class ChatbotRetentionTestCase(TestCase):
+    """
+    Test cases for the chat history retention job.
+    """
+
+    def setUp(self):
+        """Create old and recent messages and a temporary archive folder."""
+        self.archive_dir = tempfile.mkdtemp()
+        old = timezone.now() - datetime.timedelta(days=200)
+
+        self.old_session = ChatSession.objects.create(session_id='old_session')
+        ChatSession.objects.filter(pk=self.old_session.pk).update(updated_at=old)
+        for number in range(5):
+            ChatMessage.objects.create(
+                session=self.old_session,
+                user_message=f'Old message {number}',
+                bot_response='Old reply',
+                timestamp=old
+            )
+
+        recent_session = ChatSession.objects.create(session_id='recent_session')
+        ChatMessage.objects.create(session=recent_session, user_message='Hello', bot_response='Hi')
+
+    def retention_settings(self):
+        return {'ARCHIVE_DIR': self.archive_dir, 'BATCH_SIZE': 2, 'BATCH_PAUSE': 0}
+
+    def test_dry_run_changes_nothing(self):
+        """Test that a dry run only counts rows."""
+        with override_settings(CHATBOT_RETENTION=self.retention_settings()):
+            results = compact_history(dry_run=True)
+        self.assertEqual(results['chatmessage'], 5)
+        self.assertEqual(ChatMessage.objects.count(), 6)
+        self.assertEqual(os.listdir(self.archive_dir), [])
+
+    def test_old_rows_are_rolled_up_archived_and_deleted(self):
+        """Test the full compaction of old messages and sessions."""
+        with override_settings(CHATBOT_RETENTION=self.retention_settings()):
+            results = compact_history()
+
+        self.assertEqual(results, {'chatmessage': 5, 'chatsession': 1})
+        self.assertEqual(ChatMessage.objects.count(), 1)
+        self.assertFalse(ChatSession.objects.filter(session_id='old_session').exists())
+        self.assertEqual(DailyChatStats.objects.get().message_count, 5)
+
+        archive_name = [name for name in os.listdir(self.archive_dir) if name.startswith('chatmessage')][0]
+        with gzip.open(os.path.join(self.archive_dir, archive_name), 'rt') as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['user_message'], 'Old message 0')
+
+    def test_interrupted_run_keeps_daily_totals(self):
+        """Test that a rerun does not recount a partly deleted day."""
+        with override_settings(CHATBOT_RETENTION=self.retention_settings()):
+            with mock.patch('chatbot.retention.time.sleep', side_effect=RuntimeError('interrupted')):
+                with self.assertRaises(RuntimeError):
+                    compact_history()
+            self.assertEqual(ChatMessage.objects.count(), 4)
+            compact_history()
+
+        self.assertEqual(ChatMessage.objects.count(), 1)
+        self.assertEqual(DailyChatStats.objects.get().message_count, 5)
+
+    def test_session_with_new_message_is_kept(self):
+        """Test that a session written to during compaction is not deleted."""
+        def add_message_before_delete(queryset, batch_size):
+            for batch in iter_batches(queryset, batch_size):
+                ChatMessage.objects.create(session=self.old_session, user_message='Back again', bot_response='Hi')
+                yield batch
+
+        with override_settings(CHATBOT_RETENTION=self.retention_settings()):
+            compact_history(tables=['chatmessage'])
+            with mock.patch('chatbot.retention.iter_batches', side_effect=add_message_before_delete):
+                results = compact_history(tables=['chatsession'])
+
+        self.assertEqual(results, {'chatsession': 0})
+        self.assertEqual(ChatMessage.objects.filter(session=self.old_session).count(), 1)
+
+
+class ChatbotCorpusTestCase(TestCase):
+    """
+    Test cases for streaming JSONL corpus files.
+    """
+
+    def test_read_gzip_corpus(self):
+        """Test reading records from a compressed corpus file."""
+        path = os.path.join(tempfile.mkdtemp(), 'corpus.jsonl.gz')
+        with gzip.open(path, 'wt', encoding='utf-8') as corpus_file:
+            corpus_file.write(json.dumps({'conversation': ['Hello', 'Hi']}) + '\n\n')
+            corpus_file.write(json.dumps({'text': 'Bye'}) + '\n')
+
+        records = list(read_records(path))
+        self.assertEqual(records, [{'conversation': ['Hello', 'Hi']}, {'text': 'Bye'}])
+
+    def test_invalid_line_reports_line_number(self):
+        """Test that a broken line raises a helpful error."""
+        path = os.path.join(tempfile.mkdtemp(), 'corpus.jsonl')
+        with open(path, 'w', encoding='utf-8') as corpus_file:
+            corpus_file.write('{"text": "ok"}\nnot json\n')
+
+        with self.assertRaisesMessage(ValueError, 'line 2'):
+            list(read_records(path))
+
+    def test_conversations_are_expanded_into_responses(self):
+        """Test that each conversation line responds to the previous one."""
+        statements = list(expand_records([
+            {'conversation': ['Hello', 'Hi', 'How are you?']},
+            {'text': 'Fine', 'in_response_to': 'How are you?', 'id': 7},
+        ]))
+        self.assertEqual(
+            [(data['text'], data['in_response_to']) for data in statements],
+            [('Hello', None), ('Hi', 'Hello'), ('How are you?', 'Hi'), ('Fine', 'How are you?')]
+        )
+        self.assertNotIn('id', statements[-1])
+
+    def create_scratch_bot(self, directory, name):
+        return ChatBot(
+            name,
+            database_uri='sqlite:///' + os.path.join(directory, f'{name}.sqlite3'),
+            tagger=LowercaseTagger,
+            logic_adapters=['chatterbot.logic.BestMatch']
+        )
+
+    def test_import_and_export_round_trip(self):
+        """Test that a corpus survives import, export and import again."""
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'corpus.jsonl')
+        with open(path, 'w', encoding='utf-8') as corpus_file:
+            corpus_file.write(json.dumps({'conversation': ['Hello  there ', 'Hi!', 'How are you?']}) + '\n')
+            corpus_file.write(json.dumps({'text': 'Fine', 'in_response_to': ' How are  you?', 'tags': ['mood']}) + '\n')
+
+        first_bot = self.create_scratch_bot(directory, 'first')
+        self.assertEqual(import_corpus(first_bot, path, batch_size=2), 4)
+        hi = next(first_bot.storage.filter(text='Hi!'))
+        self.assertEqual(hi.in_response_to, 'Hello there')
+        self.assertEqual(hi.search_in_response_to, 'hello there')
+
+        export_path = os.path.join(directory, 'export.jsonl.gz')
+        self.assertEqual(export_corpus(first_bot, export_path, batch_size=3), 4)
+
+        second_bot = self.create_scratch_bot(directory, 'second')
+        self.assertEqual(import_corpus(second_bot, export_path, batch_size=3), 4)
+
+        def stored(bot):
+            return sorted(
+                (statement.text, statement.in_response_to, tuple(statement.get_tags()))
+                for statement in bot.storage.filter()
+            )
+        self.assertEqual(stored(first_bot), stored(second_bot))
+        self.assertIn(('Fine', 'How are you?', ('mood',)), stored(second_bot))
+
+
+class ChatbotStaticAssetsTestCase(TestCase):
+    """
+    Test cases for precompressed, fingerprinted static files.
+    """
+
+    def setUp(self):
+        """Write a hashed file and its compressed copy to a temporary root."""
+        self.static_root = tempfile.mkdtemp()
+        storage = CompressedManifestStaticFilesStorage(location=self.static_root)
+        with open(os.path.join(self.static_root, 'chat.0123456789ab.js'), 'w') as script:
+            script.write('console.log("hello");\n' * 50)
+        storage.compress('chat.0123456789ab.js')
+        self.factory = RequestFactory()
+
+    def test_accepted_encodings(self):
+        """Test parsing of the Accept-Encoding header."""
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip, br;q=0, deflate;q=0.5')
+        self.assertEqual(get_accepted_encodings(request), {'gzip', 'deflate'})
+
+    def test_serve_precompressed_file(self):
+        """Test that gzip is served with far-future cache headers."""
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        with override_settings(STATIC_ROOT=self.static_root):
+            response = serve(request, 'chat.0123456789ab.js')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        response.close()
+
+    def test_serve_rejects_paths_outside_root(self):
+        """Test that files outside STATIC_ROOT are not served."""
+        from django.http import Http404
+        with override_settings(STATIC_ROOT=self.static_root):
+            with self.assertRaises(Http404):
+                serve(self.factory.get('/'), '../settings.py')
+
+
+class ChatbotMemoryProfilingTestCase(TestCase):
+    """
+    Test cases for the memory profiler.
+    """
+
+    def test_growth_per_request(self):
+        """Test the least-squares growth estimate."""
+        self.assertEqual(growth_per_request([(10, 1000), (20, 2000), (30, 3000)]), 100)
+        self.assertEqual(growth_per_request([(10, 1000)]), 0)
+
+    def test_component_for_filename(self):
+        """Test that allocations are attributed to the right component."""
+        self.assertEqual(component_for_filename('/site-packages/sqlalchemy/orm/query.py'), 'sqlalchemy')
+        self.assertEqual(component_for_filename('/site-packages/spacy/language.py'), 'tagger models')
+        self.assertEqual(component_for_filename('/usr/lib/python3/json/decoder.py'), 'other')
+
+    def test_growth_is_flagged(self):
+        """Test that steadily growing memory is reported as a leak."""
+        if not tracemalloc.is_tracing():
+            self.addCleanup(tracemalloc.stop)
+        profiler = MemoryProfiler()
+        profiler.stage('start')
+        leaked = []
+        for count in range(1, 51):
+            leaked.append(bytearray(10000))
+            if count % 10 == 0:
+                profiler.sample(count)
+
+        report = profiler.report(threshold=1024)
+        self.assertTrue(report['leak_suspected'])
+        self.assertEqual(report['requests'], 50)
+        self.assertIn('components', report['stages'][0])
+
+    def test_memory_report_requires_profiling(self):
+        """Test that the debug endpoint is hidden unless enabled."""
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        response = self.client.get(reverse('chatbot:memory_report'))
+        self.assertEqual(response.status_code, 404)
+
+        with override_settings(CHATBOT_MEMORY_PROFILING=True):
+            response = self.client.get(reverse('chatbot:memory_report'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('current_rss', json.loads(response.content))
+
+
+class ChatbotResponseSnapshotTestCase(TestCase):
+    """
+    Test cases for the memory-mapped response snapshot.
+    """
+
+    def setUp(self):
+        """Build a snapshot from a few prompt and response pairs."""
+        self.path = os.path.join(tempfile.mkdtemp(), 'responses.snapshot')
+        build_snapshot([
+            ('Hello', 'Hi there!'),
+            ('hello!', 'Hey'),
+            ('Hello', 'Hi there!'),
+            ('What is Django?', 'A Python web framework.'),
+            ('Wie geht es dir?', 'Gut, danke schön.'),
+        ], self.path)
+        self.snapshot = ResponseSnapshot(self.path)
+
+    def tearDown(self):
+        self.snapshot.close()
+
+    def test_lookup_normalizes_and_dedupes(self):
+        """Test that prompts are matched after normalization."""
+        self.assertEqual(len(self.snapshot), 3)
+        self.assertEqual(self.snapshot.get_responses('HELLO'), ['Hi there!', 'Hey'])
+        self.assertEqual(self.snapshot.lookup('what is django'), 'A Python web framework.')
+        self.assertEqual(self.snapshot.lookup('wie geht es dir'), 'Gut, danke schön.')
+
+    def test_unknown_prompt(self):
+        """Test that unknown prompts return nothing."""
+        self.assertIsNone(self.snapshot.lookup('Something new'))
+        self.assertEqual(self.snapshot.get_responses('Something new'), [])
+
+    def test_invalid_file_is_not_loaded(self):
+        """Test that a corrupt or missing file is ignored."""
+        path = os.path.join(tempfile.mkdtemp(), 'broken.snapshot')
+        with open(path, 'wb') as broken:
+            broken.write(b'not a snapshot at all')
+        self.assertIsNone(load_snapshot(path))
+        self.assertIsNone(load_snapshot(path + '.missing'))
+
+        with open(self.path, 'rb') as snapshot_file:
+            data = snapshot_file.read()
+        for size in (30, 41, len(data) - 4, len(data) - 1):
+            with open(path, 'wb') as truncated:
+                truncated.write(data[:size])
+            self.assertIsNone(load_snapshot(path))
+
+
+@mock.patch.object(conversation_cache, 'async_flush', False)
 class ChatbotIntegrationTestCase(TestCase):
     """
     Integration tests for the complete chatbot functionality.
     """
 
+    def tearDown(self):
+        """Drop queued chat turns so they are not saved after the test database is gone."""
+        conversation_cache.clear()
+
     def test_full_conversation_flow(self):
         """Test a complete conversation flow through the web interface."""
         # Test home page loads
@@ -196,4 +799,13 @@ class ChatbotIntegrationTestCase(TestCase):
         data2 = json.loads(response2.content)
 
         self.assertIn('bot_response', data1)
-        self.assertIn('bot_response', data2)
\ No newline at end of file
+        self.assertIn('bot_response', data2)
+
+    def test_session_cookie_keeps_context(self):
+        """Test that turns are cached under the visitor's session cookie."""
+        response = self.client.get(reverse('chatbot:get_response'), {'message': 'Hello'})
+        session_id = response.cookies['chat_session_id'].value
+
+        self.client.get(reverse('chatbot:get_response'), {'message': 'How are you?'})
+        context = conversation_cache.get_context(session_id)
+        self.assertEqual([turn[0] for turn in context], ['Hello', 'How are you?'])
\ No newline at end of file
@@ -27,4 +27,8 @@ urlpatterns = [
     # About page
     # URL: http://127.0.0.1:8000/about/
     path('about/', views.about, name='about'),
+
+    # Memory profile of the worker, staff only and when profiling is enabled
+    # URL: http://127.0.0.1:8000/debug/memory/
+    path('debug/memory/', views.memory_report, name='memory_report'),
 ]
\ No newline at end of file
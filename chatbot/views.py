@@ -6,14 +6,86 @@ and return HTTP responses for the chatbot web interface.
 """
 
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_page
 from django.views.generic import TemplateView
+from django.conf import settings
+from django.core.cache import cache
 import json
+import re
+import uuid
 from .bot import get_bot_response
+from .profiling import get_rss, is_profiling_enabled, profiler
 
+# Cookie that identifies a visitor's chat session
+CHAT_SESSION_COOKIE = 'chat_session_id'
+CHAT_SESSION_MAX_AGE = 60 * 60 * 24 * 30
 
+# Replies are remembered per Idempotency-Key so retried messages are not answered twice
+IDEMPOTENCY_KEY_RE = re.compile(r'^[A-Za-z0-9-]{8,64}$')
+IDEMPOTENCY_TIMEOUT = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TIMEOUT = 30
+
+# Rendered pages are cached, ConditionalGetMiddleware adds ETag/304 support
+PAGE_CACHE_TIMEOUT = getattr(settings, 'CHATBOT_PAGE_CACHE_TIMEOUT', 60 * 15)
+
+
+def get_chat_session_cookie(request):
+    """
+    Return the chat session ID sent in the request cookie, or None.
+
+    A plain cookie is used instead of Django sessions so that
+    looking up the session never needs a database query.
+
+    Args:
+        request (HttpRequest): The HTTP request object
+
+    Returns:
+        str: Chat session identifier, or None if it is missing or malformed
+    """
+    session_id = request.COOKIES.get(CHAT_SESSION_COOKIE, '')
+    if len(session_id) == 32 and session_id.isalnum():
+        return session_id
+    return None
+
+
+def get_chat_session_id(request):
+    """
+    Return the chat session ID from the request cookie, or a new one.
+    """
+    return get_chat_session_cookie(request) or uuid.uuid4().hex
+
+
+def get_idempotency_key(request):
+    """
+    Return the Idempotency-Key header of a request if it is valid.
+
+    Args:
+        request (HttpRequest): The HTTP request object
+
+    Returns:
+        str: The key, or None if it is missing or malformed
+    """
+    key = request.headers.get('Idempotency-Key', '')
+    return key if IDEMPOTENCY_KEY_RE.match(key) else None
+
+
+def set_chat_session_cookie(response, session_id):
+    """Attach the chat session cookie to a response."""
+    response.set_cookie(
+        CHAT_SESSION_COOKIE,
+        session_id,
+        max_age=CHAT_SESSION_MAX_AGE,
+        httponly=True,
+        samesite='Lax'
+    )
+    return response
+
+
+@cache_page(PAGE_CACHE_TIMEOUT)
 def home(request):
     """
     Display the main chat interface.
@@ -38,6 +110,18 @@ def get_response(request):
     This view handles AJAX requests from the frontend to get
     chatbot responses. It accepts both GET and POST requests.
 
+    Clients may send an Idempotency-Key header. A retry with the same
+    key gets the stored reply back instead of asking the bot (and
+    teaching it) a second time. While the first request with a key is
+    still being answered, retries get a 409 with a Retry-After header.
+    Failures are answered with a 503 and are not stored, so a retry
+    asks the bot again.
+
+    Stored replies and locks remember the chat session that made them.
+    A request from a different session gets a 422. A request without a
+    session cookie, e.g. a first-time visitor retrying after a timeout,
+    is treated as that session and gets its cookie back.
+
     Args:
         request (HttpRequest): The HTTP request object
 
@@ -67,23 +151,62 @@ def get_response(request):
             'bot_response': 'Please type a message!'
         })
 
+    cookie_session_id = get_chat_session_cookie(request)
+    session_id = get_chat_session_id(request)
+
+    # Replay the stored reply if this message was already answered
+    idempotency_key = get_idempotency_key(request)
+    if idempotency_key:
+        result_key = f'chatbot:idempotency:{idempotency_key}'
+        lock_key = f'{result_key}:lock'
+
+        stored = cache.get(result_key)
+        if stored is not None:
+            if cookie_session_id not in (None, stored['session_id']):
+                return set_chat_session_cookie(JsonResponse({
+                    'error': 'Idempotency key was already used in another chat session'
+                }, status=422), session_id)
+            if stored['response']['user_message'] != user_message:
+                return set_chat_session_cookie(JsonResponse({
+                    'error': 'Idempotency key was already used for a different message'
+                }, status=422), session_id)
+            return set_chat_session_cookie(JsonResponse(stored['response']), stored['session_id'])
+
+        if not cache.add(lock_key, session_id, IDEMPOTENCY_LOCK_TIMEOUT):
+            response = JsonResponse({
+                'error': 'This message is still being answered'
+            }, status=409)
+            response['Retry-After'] = '1'
+            # Join the session of the attempt in progress so the retry matches it
+            owner_session_id = cache.get(lock_key) if cookie_session_id is None else None
+            return set_chat_session_cookie(response, owner_session_id or session_id)
+
     # Get response from chatbot
     try:
-        bot_response = get_bot_response(user_message)
-        return JsonResponse({
+        bot_response = get_bot_response(user_message, session_id=session_id, raise_errors=True)
+        data = {
             'user_message': user_message,
             'bot_response': bot_response,
             'success': True
-        })
+        }
+        if idempotency_key:
+            cache.set(result_key, {'response': data, 'session_id': session_id}, IDEMPOTENCY_TIMEOUT)
+        return set_chat_session_cookie(JsonResponse(data), session_id)
     except Exception as e:
-        return JsonResponse({
+        response = JsonResponse({
             'error': 'Failed to get bot response',
             'user_message': user_message,
             'bot_response': 'Sorry, I encountered an error. Please try again.',
             'success': False
-        })
+        }, status=503)
+        response['Retry-After'] = '1'
+        return set_chat_session_cookie(response, session_id)
+    finally:
+        if idempotency_key:
+            cache.delete(lock_key)
 
 
+@method_decorator(cache_page(PAGE_CACHE_TIMEOUT), name='dispatch')
 class ChatView(TemplateView):
     """
     Class-based view for the chat interface.
@@ -107,6 +230,7 @@ class ChatView(TemplateView):
         return context
 
 
+@cache_page(PAGE_CACHE_TIMEOUT)
 def about(request):
     """
     Display information about the chatbot.
@@ -127,4 +251,26 @@ def about(request):
             'Easy to extend and customize'
         ]
     }
-    return render(request, 'chatbot/about.html', context)
\ No newline at end of file
+    return render(request, 'chatbot/about.html', context)
+
+
+@staff_member_required
+def memory_report(request):
+    """
+    Show the memory profile of this worker process as JSON.
+
+    Only available to staff users, and only when
+    CHATBOT_MEMORY_PROFILING is enabled in settings.
+
+    Args:
+        request (HttpRequest): The HTTP request object
+
+    Returns:
+        JsonResponse: Memory stages, growth per request and leak warning
+    """
+    if not is_profiling_enabled():
+        raise Http404('Memory profiling is not enabled')
+
+    report = profiler.report()
+    report['current_rss'] = get_rss()
+    return JsonResponse(report)
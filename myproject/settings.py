@@ -38,10 +38,12 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',  # ETag and 304 Not Modified
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'chatbot.profiling.MemorySamplingMiddleware',  # Only active when CHATBOT_MEMORY_PROFILING is True
 ]
 
 ROOT_URLCONF = 'myproject.urls'
@@ -100,6 +102,29 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 STATIC_URL = '/static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic adds a content hash to each file name and writes
+# .gz (and .br, if the brotli package is installed) copies next to it
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'chatbot.static_assets.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Cache used for rendered pages and Idempotency-Key replies
+# With several worker processes, use a shared backend such as Redis or Memcached
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Seconds a rendered page is cached for
+CHATBOT_PAGE_CACHE_TIMEOUT = 60 * 15
 
 # Remove STATICFILES_DIRS since we're using app-specific static files
 # STATICFILES_DIRS = [
@@ -110,6 +135,39 @@ STATIC_URL = '/static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Chatbot conversation context cache
+# Recent turns are kept in memory per session and saved to ChatMessage in batches
+CHATBOT_CONTEXT_CACHE = {
+    'MAX_TURNS_PER_SESSION': 10,   # Turns kept for each session
+    'MAX_SESSIONS': 10000,         # Least recently used sessions are dropped beyond this
+    'MAX_PENDING': 5000,           # Turns waiting to be saved
+    'FLUSH_INTERVAL': 2.0,         # Seconds between background saves
+    'ASYNC_FLUSH': True,           # Save from a background thread
+}
+
+# Memory-mapped snapshot of known prompts and responses, shared by all workers
+# Build it with `python manage.py build_response_snapshot`, the file is optional
+CHATBOT_RESPONSE_SNAPSHOT = BASE_DIR / 'chatbot_responses.snapshot'
+
+# Chat history retention, applied by `python manage.py compact_history`
+# Old rows are rolled up into DailyChatStats, archived as .jsonl.gz and deleted in batches
+CHATBOT_RETENTION = {
+    'ARCHIVE_DIR': BASE_DIR / 'archive',
+    'BATCH_SIZE': 500,             # Rows deleted per transaction
+    'BATCH_PAUSE': 0.05,           # Seconds to pause between batches
+    'TABLES': {
+        # KEEP_DAYS: None keeps rows forever, ARCHIVE: False deletes without archiving
+        'chatmessage': {'KEEP_DAYS': 90, 'ARCHIVE': True},
+        'chatsession': {'KEEP_DAYS': 90, 'ARCHIVE': True},
+    },
+}
+
+# Memory profiling (see also `python manage.py profile_memory`)
+# When enabled, memory is sampled every few requests and shown at /debug/memory/.
+# Allocations are traced from app startup; set PYTHONTRACEMALLOC=1 to trace from interpreter start.
+CHATBOT_MEMORY_PROFILING = False
+CHATBOT_MEMORY_SAMPLE_EVERY = 10
+
 # Logging configuration for debugging
 LOGGING = {
     'version': 1,
@@ -19,8 +19,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
+from chatbot.static_assets import serve as serve_static
 
 urlpatterns = [
     # Django admin interface
@@ -31,4 +33,11 @@ urlpatterns = [
     # All chatbot URLs will be available at the root level
     # Access at: http://127.0.0.1:8000/
     path('', include('chatbot.urls')),
-]
\ No newline at end of file
+]
+
+if not settings.DEBUG:
+    # Serve collected, precompressed static files with long cache headers
+    # Access at: http://127.0.0.1:8000/static/
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve_static),
+    ]